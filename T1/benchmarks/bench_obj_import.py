@@ -0,0 +1,54 @@
+"""
+Mede o custo por face da importação de arquivos .obj com um único grupo.
+
+Gera malhas sintéticas (grades de triângulos) com o número de faces pedido.
+O tempo por face deve ficar constante quando o arquivo cresce.
+
+Uso (a partir da pasta T1):
+    python -m benchmarks.bench_obj_import [n_faces ...]
+"""
+import os
+import sys
+import tempfile
+from time import perf_counter
+
+from src.OBJFileUtils import OBJParser
+
+
+def write_grid_obj(file_name: str, n_faces: int) -> None:
+    # Grade de (side x side) quadrados, dois triângulos por quadrado
+    side = max(1, int((n_faces / 2) ** 0.5))
+    columns = -(-n_faces // (2 * side))
+    with open(file_name, "w") as f:
+        for row in range(side + 1):
+            f.writelines(f"v {column} {row} 700\n" for column in range(columns + 1))
+        f.write("g grid\n")
+        faces = 0
+        for row in range(side):
+            for column in range(columns):
+                a = row * (columns + 1) + column + 1
+                b, c, d = a + 1, a + columns + 1, a + columns + 2
+                f.write(f"f {a} {b} {d}\nf {a} {d} {c}\n")
+                faces += 2
+                if faces >= n_faces:
+                    return
+
+
+def bench(n_faces: int, directory: str) -> None:
+    file_name = os.path.join(directory, f"grid_{n_faces}.obj")
+    write_grid_obj(file_name, n_faces)
+
+    start = perf_counter()
+    objects = OBJParser(file_name).objects
+    elapsed = perf_counter() - start
+
+    grid = objects["grid"]
+    print(f"{n_faces:>10} faces {len(grid['coordinates']):>10} vertices"
+          f"{elapsed:10.3f} s{elapsed / n_faces * 1e6:10.2f} us/face")
+
+
+if __name__ == "__main__":
+    sizes = [int(n) for n in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            bench(size, directory)
@@ -0,0 +1,84 @@
+"""
+Mede o custo por vértice das transformações de Objeto3D em malhas grandes.
+
+Uso (a partir da pasta T1):
+    python -m benchmarks.bench_transformations [n_vertices ...]
+"""
+import sys
+from time import perf_counter
+
+import numpy as np
+
+from src.Objetos.WireFrame import WireFrame
+from src.TransformationUtils.Transformations import (Translation, Scaling,
+                                                     Rotation, Rotation3DType)
+
+
+def per_vertex_reference(obj: WireFrame, matrix: np.ndarray) -> np.ndarray:
+    # Caminho antigo: um np.dot por vértice
+    return np.array(
+        [
+            np.dot(np.array([x, y, z, 1]), matrix)[:-1]
+            for x, y, z in obj.homogeneous_coordinates[:, :3]
+        ]
+    )
+
+
+def materialized(obj: WireFrame, transformation: callable, *args) -> np.ndarray:
+    transformation(*args)
+    return obj.homogeneous_coordinates
+
+
+def transform_chain(obj: WireFrame, n_transforms: int) -> np.ndarray:
+    for _ in range(n_transforms):
+        obj.translation(1, 1, 1)
+    return obj.homogeneous_coordinates
+
+
+def timed(function: callable, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        function()
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def bench(n_vertices: int) -> None:
+    rng = np.random.default_rng(0)
+    coords = [tuple(c) for c in rng.uniform(-500, 500, (n_vertices, 3))]
+    obj = WireFrame("bench", coords)
+    matrix = obj.get_Z_rotation_matrix(30)
+    transformations = [
+        Translation(10, 20, 30),
+        Rotation(str(Rotation3DType.center_Y), 45),
+        Scaling(1.5, 1.5, 1.5),
+    ]
+
+    # The transformations only compose the model matrix, the vertex pass
+    # happens when the world coordinates are requested, so every case
+    # asks for them after transforming
+    cases = {
+        "calculate_coords": lambda: obj.calculate_coords(matrix),
+        "translation": lambda: materialized(obj, obj.translation, 1, 1, 1),
+        "scaling": lambda: materialized(obj, obj.scaling, 1.01, 1.01, 1.01),
+        "rotation": lambda: materialized(obj, obj.rotation, str(Rotation3DType.center_Z), 5),
+        "apply_transformations": lambda: materialized(
+            obj, obj.apply_transformations, transformations, lambda dx, dy, dz: (dx, dy, dz)
+        ),
+        "10 transforms + world": lambda: transform_chain(obj, 10),
+    }
+    if n_vertices <= 100_000:
+        cases["per-vertex (old)"] = lambda: per_vertex_reference(obj, matrix)
+
+    print(f"\n{n_vertices} vertices")
+    for name, function in cases.items():
+        elapsed = timed(function)
+        print(f"  {name:<24}{elapsed * 1e3:10.3f} ms"
+              f"{elapsed / n_vertices * 1e9:10.1f} ns/vertex")
+
+
+if __name__ == "__main__":
+    sizes = [int(n) for n in sys.argv[1:]] or [2_000, 20_000, 200_000, 1_000_000]
+    for size in sizes:
+        bench(size)
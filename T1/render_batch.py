@@ -0,0 +1,43 @@
+import argparse
+
+from src.BatchRender import find_obj_files, render_files, BACKENDS
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Renders .obj files without opening the graphical interface"
+    )
+    parser.add_argument("paths", nargs="+",
+                        help=".obj files or directories (searched recursively)")
+    parser.add_argument("-o", "--output-dir", default="renders")
+    parser.add_argument("-f", "--format", choices=sorted(BACKENDS), default="png",
+                        help="png/ppm images or a json display list of the clipped 2D primitives")
+    parser.add_argument("--width", type=int, default=740)
+    parser.add_argument("--height", type=int, default=740)
+    parser.add_argument("--zoom", type=int, default=0,
+                        help="zoom steps, as the +/- buttons (negative zooms out)")
+    parser.add_argument("--pan", type=float, nargs=2, default=(0, 0), metavar=("DX", "DY"))
+    parser.add_argument("--rotation", type=float, default=0,
+                        help="window rotation, in degrees")
+    parser.add_argument("--clipping", choices=["L-B", "C-S", "N-L-N"], default="L-B")
+    parser.add_argument("--no-fit", dest="fit", action="store_false",
+                        help="keep the world coordinates instead of fitting the scene to the window")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="number of processes (default: one per CPU)")
+    args = parser.parse_args()
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    files = find_obj_files(args.paths)
+    if not files:
+        print("No .obj files found.")
+        return
+
+    render_files(files, args.output_dir, workers=args.workers,
+                 output_format=args.format, width=args.width, height=args.height,
+                 zoom=args.zoom, pan=tuple(args.pan), rotation=args.rotation,
+                 clipping=args.clipping, fit=args.fit)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,11 @@
 import tkinter as tk
 from tkinter import messagebox
 import ast
+import time
 
 import src.Window as WW
 from src.Objetos import Objeto3D as Obj3D
-from src.Objetos import Ponto3D as P3D
-from src.Objetos import Linha3D as L3D
-from src.Objetos import WireFrame as WF
-from src.Objetos import CurvaBezier as BC
-from src.Objetos import CurvaBSpline as BSC
-from src.Objetos import BezierSurface as BBC
-from src.Objetos import BSplineSurface as BSB
+from src.Objetos.ObjectFactory import create_object, create_object_from_obj
 from src.OBJFileUtils import OBJParser as OBJP, OBJGenerator as OBJG
 import src.WindowUtilis.DisplayFile as DF
 import src.WindowUtilis.DrawWindow as DW
@@ -18,6 +13,9 @@ import src.WindowUtilis.OptionsFrame as OF
 
 
 class App:
+    # Milliseconds between the checks for tessellated tiles
+    TESSELLATION_POLL_MS = 30
+
     def __init__(self, title="Window", width=960, height=720):
         self.__root = tk.Tk()
 
@@ -25,12 +23,15 @@ class App:
         self.__left_frame.pack(side=tk.LEFT, padx=(80, 0), fill=tk.X)
 
         self.__display_file = DF.DisplayFile(self.__left_frame,
-                                             self.__apply_transformations)
+                                             self.__apply_transformations,
+                                             forget_function=self.__forget_object)
         self.__root.title(title)
         self.__root.geometry(f"{width}x{height}")
         self.__root.resizable(False, False)
 
         self.__window = WW.Window(self.__root, 740, 740)
+        # Whether a check for tessellated tiles is already scheduled
+        self.__tessellation_polling = False
 
         self.__options_frame = None
 
@@ -100,6 +101,39 @@ class App:
         self.__options_frame.add_button(button_text="Liang Barsky",
                                         function=lambda: self.__set_clipping_algorithm("L-B"),
                                         parent="clipping")
+
+        # Render backend
+        self.__options_frame.add_label(label_text="Render Backend",
+                                       parent="render", bold=True)
+        self.__options_frame.add_button(button_text="Tk Canvas",
+                                        function=lambda: self.__set_render_backend("canvas"),
+                                        parent="render", side=tk.LEFT)
+        self.__options_frame.add_button(button_text="NumPy Raster",
+                                        function=lambda: self.__set_render_backend("raster"),
+                                        parent="render", side=tk.LEFT)
+
+        # Curve tessellation
+        self.__options_frame.add_label(label_text="Curve Tessellation",
+                                       parent="tessellation", bold=True)
+        self.__options_frame.add_button(button_text="Fixed",
+                                        function=lambda: self.__set_tessellation_mode("fixed"),
+                                        parent="tessellation", side=tk.LEFT)
+        self.__options_frame.add_button(button_text="Adaptive",
+                                        function=lambda: self.__set_tessellation_mode("adaptive"),
+                                        parent="tessellation", side=tk.LEFT)
+
+        # Tessellation pool
+        self.__options_frame.add_label(label_text="Tessellation Pool",
+                                       parent="tessellation_pool", bold=True)
+        self.__options_frame.add_button(button_text="Serial",
+                                        function=lambda: self.__set_tessellation_pool("serial"),
+                                        parent="tessellation_pool", side=tk.LEFT)
+        self.__options_frame.add_button(button_text="Threads",
+                                        function=lambda: self.__set_tessellation_pool("thread"),
+                                        parent="tessellation_pool", side=tk.LEFT)
+        self.__options_frame.add_button(button_text="Processes",
+                                        function=lambda: self.__set_tessellation_pool("process"),
+                                        parent="tessellation_pool", side=tk.LEFT)
         
 
     def __get_object(self) -> list[tuple[float]]:
@@ -114,7 +148,7 @@ class App:
                 f_coords = self.__parse_surface_string(coords)
             else:
                 f_coords = self.__string_to_float_tuple_list(coords)
-            output = self.__create_object(name, f_coords, color, fill, obj_type)
+            output = create_object(name, f_coords, color, fill, obj_type)
             self.__update_display_file(output)
             return output
 
@@ -122,24 +156,6 @@ class App:
             messagebox.showinfo("Input Error", "Invalid input. Please try again.")
             print("Error in get_object:", e)
 
-    def __create_object(self, name, coords, color, fill=False,
-                        obj_type: int=Obj3D.ObjectType.OBJECT3D.value, edges=[]) -> Obj3D:
-        if obj_type == Obj3D.ObjectType.BEZIER_CURVE.value:
-            output = BC.CurvaBezier(name, coords, color=color)
-        elif obj_type == Obj3D.ObjectType.BSPLINE_CURVE.value:
-            output = BSC.CurvaBSpline(name, coords, color=color)
-        elif obj_type == Obj3D.ObjectType.BEZIER_SURFACE.value:
-            output = BBC.BezierSurface(name, coords, color=color)
-        elif obj_type == Obj3D.ObjectType.BSPLINE_SURFACE.value:
-            output = BSB.BSplineSurface(name, coords, color=color)
-        elif len(coords) == 1:
-            output = P3D.Ponto3D(name, coords, color=color)
-        elif len(coords) == 2:
-            output = L3D.Linha3D(name, coords, color=color)
-        else:
-            output = WF.WireFrame(name, coords, color=color, fill=fill, edges=edges)
-        return output
-
     def __string_to_float_tuple_list(self, string:str):
         # Remover parênteses externos e dividir a string em substrings de tuplas
         tuples = string.strip("()").split("),(")
@@ -167,15 +183,39 @@ class App:
         return name, coords, color, fill, obj_type
 
     def __draw_all_objects(self):
-        self.__window.delete("all")
-        for obj in self.__display_file.objects:
-            self.__window.draw_object(obj)
-        self.__window.draw_viewport_outer_frame()
+        self.__window.begin_frame()
+        # Only the objects in the view volume are projected and clipped,
+        # the others keep their items hidden
+        rows, objects = self.__display_file.visible_objects(self.__window.view_footprint(),
+                                                            self.__window.projection_distance)
+        scene_store = self.__display_file.scene_store
+        if scene_store is not None:
+            self.__window.draw_scene(scene_store, rows)
+        self.__window.draw_objects(objects)
+        self.__window.end_frame()
+        self.__poll_tessellation()
+
+    def __poll_tessellation(self) -> None:
+        # The tiles of a tessellation pool are drawn as they arrive, the
+        # Tk loop is never blocked waiting for them
+        if self.__window.tessellation_pending and not self.__tessellation_polling:
+            self.__tessellation_polling = True
+            self.__root.after(self.TESSELLATION_POLL_MS, self.__collect_tessellation)
+
+    def __collect_tessellation(self) -> None:
+        self.__tessellation_polling = False
+        if self.__window.collect_tessellation():
+            self.__draw_all_objects()
+        else:
+            self.__poll_tessellation()
 
-    def __apply_transformations(self, object_index: int, transformations: list):
-        obj = self.__display_file.objects[object_index]
+    def __apply_transformations(self, object_handle: int, transformations: list):
+        obj = self.__display_file.get_object(object_handle)
+        if obj is None:
+            return
         obj.apply_transformations(transformations=transformations,
                                   transform_vector_function=self.__window.unrotate_vector)
+        self.__display_file.update_object(obj)
         self.__draw_all_objects()
 
     def __update_display_file(self, new_object: Obj3D.Objeto3D):
@@ -205,26 +245,55 @@ class App:
         self.__draw_all_objects()
 
     def __parse_obj(self) -> None:
-        parser = OBJP()
-        objects = parser.objects
-
-        # Convert the list of lists of 3D coordinates in a list of tuples
-        for value in objects.values():
-            value["coordinates"] = [tuple(coord) for coord in value["coordinates"]]
-        
-        for name, value in objects.items():
-            edges = value["edges"] if value["type"] == "faced_obj" else []
-            self.__display_file.add_object(self.__create_object(name=name,
-                                                                coords=value["coordinates"],
-                                                                color=value["color"], 
-                                                                edges=edges)
-                                          )
+        parser = OBJP(lazy=True)
+        self.__load_objects(parser.iter_objects(), {})
+
+    def __load_objects(self, objects, faced_objects: dict, time_slice: float = 0.1) -> None:
+        # Adds the objects of the file for a short while and redraws, the
+        # rest of the file is read in the next iterations of the Tk loop.
+        # faced_objects: name -> faced object already read from the file,
+        # a group reopened later comes again at the end of the file and
+        # replaces it
+        start = time.perf_counter()
+        batch = []
+        for name, value in objects:
+            new_object = create_object_from_obj(name, value)
+            if value["type"] == "faced_obj":
+                old_object = faced_objects.get(name)
+                if old_object is not None:
+                    if any(obj is old_object for obj in batch):
+                        batch = [obj for obj in batch if obj is not old_object]
+                    else:
+                        self.__display_file.remove_object(old_object)
+                faced_objects[name] = new_object
+            batch.append(new_object)
+            if time.perf_counter() - start > time_slice:
+                self.__display_file.add_objects(batch)
+                self.__draw_all_objects()
+                self.__root.after(1, self.__load_objects, objects, faced_objects, time_slice)
+                return
 
+        self.__display_file.add_objects(batch)
         self.__draw_all_objects()
 
+    def __forget_object(self, obj: Obj3D.Objeto3D) -> None:
+        self.__window.forget_object(obj)
+
     def __generate_obj(self) -> None:
         OBJG(self.__display_file.objects)
 
+    def __set_tessellation_mode(self, mode: str) -> None:
+        self.__window.set_tessellation_mode(mode)
+        self.__draw_all_objects()
+
+    def __set_tessellation_pool(self, kind: str) -> None:
+        self.__window.set_tessellation_pool(kind)
+        self.__draw_all_objects()
+
+    def __set_render_backend(self, backend: str) -> None:
+        self.__window.set_render_backend(backend)
+        self.__draw_all_objects()
+
     # works for both the line and polygon algorithm
     def __set_clipping_algorithm(self, algorithm: str="C-S") -> None:
         self.__window.set_clipping_algorithm(algorithm)
@@ -0,0 +1,103 @@
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from glob import glob
+
+import numpy as np
+
+import src.Window as WW
+from src.Objetos import Objeto3D as Obj3D
+from src.Objetos.ObjectFactory import create_objects_from_obj
+from src.OBJFileUtils import OBJParser as OBJP
+
+# Output format -> render backend
+BACKENDS = {"png": "raster", "ppm": "raster", "json": "display_list"}
+
+
+def find_obj_files(paths: list[str]) -> list[str]:
+    # Files are taken as given, directories are searched recursively
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob(os.path.join(path, "**", "*.obj"), recursive=True)))
+        else:
+            files.append(path)
+    return files
+
+
+def fit_objects(objects: list[Obj3D.Objeto3D], width: int, height: int,
+                distance: float, margin: float = 0.9) -> None:
+    # Moves and scales the whole scene so it is centered in front of the camera,
+    # with its nearest point on the projection plane (z = distance)
+    coords = np.concatenate([obj.homogeneous_coordinates[:, :3] for obj in objects])
+    lower, upper = coords.min(axis=0), coords.max(axis=0)
+    center = (lower + upper) / 2
+    extent = upper - lower
+
+    largest = max(extent[0] / width, extent[1] / height)
+    scale = margin / largest if largest > 0 else 1
+    target = np.array([0, 0, distance + scale * extent[2] / 2])
+
+    for obj in objects:
+        # scaling() is done around the object's own center, the translation
+        # puts it back where a scaling around the scene center would
+        obj_center = np.array(obj.geometric_center())
+        obj.scaling(scale, scale, scale)
+        obj.translation(*(scale * (obj_center - center) + target - obj_center))
+
+
+def render_file(file_name: str, output_dir: str, output_format: str = "png",
+                width: int = 740, height: int = 740, zoom: int = 0,
+                pan: tuple[float, float] = (0, 0), rotation: float = 0,
+                clipping: str = "L-B", fit: bool = True) -> tuple[str, str, int]:
+    parser = OBJP(file_name)
+    objects = create_objects_from_obj(parser.objects)
+
+    window = WW.Window(None, width, height, backend=BACKENDS[output_format])
+    window.set_clipping_algorithm(clipping)
+    if objects and fit:
+        fit_objects(objects, width, height, window.projection_distance)
+    for _ in range(abs(zoom)):
+        window.zoom_in() if zoom > 0 else window.zoom_out()
+    if any(pan):
+        window.pan(*pan)
+    if rotation:
+        window.set_normalization_matrix(rotation)
+
+    window.begin_frame()
+    window.draw_objects(objects)
+    window.end_frame()
+
+    name = os.path.splitext(os.path.basename(file_name))[0]
+    output_name = os.path.join(output_dir, f"{name}.{output_format}")
+    window.save_image(output_name)
+    return file_name, output_name, len(objects)
+
+
+def _render_job(job: tuple[str, dict]) -> tuple[str, str, int]:
+    file_name, options = job
+    try:
+        return render_file(file_name, **options)
+    except Exception:
+        print(f"Error rendering {file_name}:\n{traceback.format_exc()}")
+        return file_name, None, 0
+
+
+def render_files(file_names: list[str], output_dir: str, workers: int = None,
+                 **options) -> list[tuple[str, str, int]]:
+    # The results (and the report) follow the order of file_names,
+    # whatever order the workers finish in
+    if workers is not None and workers < 1:
+        raise ValueError(f"The number of workers must be at least 1, not {workers}")
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [(file_name, dict(options, output_dir=output_dir)) for file_name in file_names]
+
+    if workers == 1 or len(jobs) < 2:
+        results = list(map(_render_job, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_render_job, jobs))
+
+    for file_name, output_name, n_objects in results:
+        print(f"{file_name} -> {output_name} ({n_objects} objects)")
+    return results
@@ -1,19 +1,38 @@
-from tkinter import filedialog
+from array import array
 from os import path, getcwd
+import numpy as np
 
 from src.Objetos.Objeto3D import Objeto3D, ObjectType
 
 
 class OBJParser:
-    def __init__(self):
-        self.__vertices = []
+    def __init__(self, file_name: str = None, lazy: bool = False):
+        # Vertices of the whole file, appended in a growable typed array
+        self.__vertices = np.empty((1024, 3))
+        self.__n_vertices = 0
         self.__objects = {}
 
+        # Faces of every faced object (kept until the end of the file, a
+        # group can be reopened), the ones still receiving faces, the ones
+        # already yielded, the yielded ones that got faces again and every
+        # name already used
+        self.__faced_objects = {}
+        self.__open_objects = {}
+        self.__closed_objects = set()
+        self.__reopened_objects = {}
+        self.__used_names = set()
+
         self.__mtl_elements = {}
 
-        self.__import_obj()
+        # Without a file name the user is asked for one
+        self.__file_name = file_name if file_name is not None else self.__get_import_file_name()
+
+        # Lazy parsers only read the file through iter_objects()
+        if not lazy:
+            self.__import_obj()
 
     def __get_import_file_name(self) -> str:
+        from tkinter import filedialog
         filename = filedialog.askopenfilename(
             title="Open a .obj file",
             initialdir=getcwd(),
@@ -22,159 +41,191 @@ class OBJParser:
         return filename
 
     def __import_obj(self) -> None:
-        file_name = self.__get_import_file_name()
-        if not file_name:
+        # A reopened group comes again with all of its faces, the last
+        # object of each name is the whole object
+        for name, obj in self.iter_objects():
+            self.__objects[name] = obj
+
+    def iter_objects(self):
+        # Reads the file line by line and yields (name, object) as soon as
+        # each object is complete: points and lines right away, faced
+        # objects when the faces start going to another object. A faced
+        # group reopened later in the file is yielded once more at the end
+        # of the file, with its old and new faces, and replaces the object
+        # yielded before
+        if not self.__file_name:
             print("Please select a file.")
             return
 
-        with open(file_name, "r") as f:
-            lines = f.readlines()
-
         current_object_name = None
         current_group_name = "default_group"
         current_color = "#000000"
+        last_face_name = None
+
+        with open(self.__file_name, "r") as f:
+            for line in f:
+                elements = line.split()
+                if not elements:  # line is empty
+                    continue
+
+                if elements[0] == "v":  # Definição de coordenadas
+                    self.__create_vertex(str_coordinates=elements[1:])
+                elif elements[0] == "o":  # Definição de um objeto
+                    current_object_name = elements[1]
+                elif elements[0] == "g":  # Definição de um grupo
+                    if len(elements) > 1:
+                        current_group_name = elements[1]
+                elif elements[0] == "p":  # Definição de um ponto com base em um vertice
+                    obj_name = self.__get_object_name(current_group_name, current_object_name)
+                    yield from self.__close_open_objects()
+                    last_face_name = None
+                    yield obj_name, self.__create_point(
+                        v_number_str=elements[1],
+                        current_color=current_color,
+                    )
+                elif elements[0] == "l":  # Definição de uma linha ou um wireframe
+                    obj_name = self.__get_object_name(current_group_name, current_object_name)
+                    yield from self.__close_open_objects()
+                    last_face_name = None
+                    yield obj_name, self.__create_line_or_wireframe(
+                        str_vertices=elements[1:],
+                        current_color=current_color,
+                    )
+                elif elements[0] == "mtllib":  # Declarar a biblioteca mtllib
+                    mtl_file_name = elements[1]
+                    self.__parse_mtl(self.__file_name, mtl_file_name)
+                elif elements[0] == "usemtl":  # Vai declarar qual usar da biblioteca
+                    current_color = self.__mtl_elements[elements[1]]
+                elif (
+                    elements[0] == "f"
+                ):
+                    obj_name = self.__get_object_name(current_group_name, current_object_name)
+                    if obj_name != last_face_name:
+                        yield from self.__close_open_objects()
+                        last_face_name = obj_name
+
+                    self.__add_face_to_current_group(
+                        str_vertices=elements[1:],
+                        current_color=current_color,
+                        current_name=obj_name,
+                    )
 
-        for line in lines:
-            if not line.strip():  # line is empty
-                continue
-
-            elements = line.split()
-
-            if elements[0] == "v":  # Definição de coordenadas
-                self.__create_vertex(str_coordinates=elements[1:])
-            elif elements[0] == "o":  # Definição de um objeto
-                current_object_name = elements[1]
-            elif elements[0] == "g":  # Definição de um grupo
-                if len(elements) > 1:
-                    current_group_name = elements[1]
-            elif elements[0] == "p":  # Definição de um ponto com base em um vertice
-                obj_name = self.__get_object_name(current_group_name, current_object_name)
-                self.__create_point(
-                    v_number_str=elements[1],
-                    current_color=current_color,
-                    current_name=obj_name,
-                )
-            elif elements[0] == "l":  # Definição de uma linha ou um wireframe
-                obj_name = self.__get_object_name(current_group_name, current_object_name)
-                self.__create_line_or_wireframe(
-                    str_vertices=elements[1:],
-                    current_color=current_color,
-                    current_name=obj_name,
-                )
-            elif elements[0] == "mtllib":  # Declarar a biblioteca mtllib
-                mtl_file_name = elements[1]
-                self.__parse_mtl(file_name, mtl_file_name)
-            elif elements[0] == "usemtl":  # Vai declarar qual usar da biblioteca
-                current_color = self.__mtl_elements[elements[1]]
-            elif (
-                elements[0] == "f"
-            ):
-                obj_name = self.__get_object_name(current_group_name, current_object_name)
-
-                self.__add_face_to_current_group(
-                    str_vertices=elements[1:],
-                    current_color=current_color,
-                    current_name=obj_name,
-                )
+        yield from self.__close_open_objects()
+        for name in self.__reopened_objects:
+            yield name, self.__build_faced_object(self.__faced_objects[name])
+        self.__reopened_objects = {}
 
     @property
     def objects(self) -> dict:
         return self.__objects
 
+    @property
+    def vertices(self) -> np.ndarray:
+        return self.__vertices[:self.__n_vertices]
+
+    def __close_open_objects(self):
+        # The reopened ones wait for the end of the file, so each group is
+        # built at most twice however many times it is reopened
+        for name in self.__open_objects:
+            if name not in self.__closed_objects:
+                self.__closed_objects.add(name)
+                yield name, self.__build_faced_object(self.__faced_objects[name])
+        self.__open_objects = {}
+
+    def __build_faced_object(self, faces: dict) -> dict:
+        # The vertices of the faces, in the order they first appear, with
+        # the ones at the same position shared by every face touching them
+        indexes = np.frombuffer(faces["vertices"], dtype=np.int64) - 1
+        sizes = np.frombuffer(faces["sizes"], dtype=np.int64)
+        # By index first, then only the distinct vertices by position
+        vertex_indexes, first, inverse = np.unique(indexes, return_index=True,
+                                                   return_inverse=True)
+        coordinates, position = np.unique(self.__vertices[vertex_indexes], axis=0,
+                                          return_inverse=True)
+        position = position.reshape(-1)
+        first_position = np.full(len(coordinates), len(indexes))
+        np.minimum.at(first_position, position, first)
+        order = np.argsort(first_position)
+        local_index = np.empty_like(order)
+        local_index[order] = np.arange(len(order))
+        local_indexes = local_index[position][inverse]
+
+        # Each face vertex is joined to the next one, the last to the first
+        starts = np.cumsum(sizes) - sizes
+        following = np.arange(1, len(indexes) + 1)
+        following[starts + sizes - 1] = starts
+        edges = np.stack([local_indexes, local_indexes[following]], axis=1)
+        return {
+            "type": "faced_obj",
+            "color": faces["color"],
+            "coordinates": coordinates[order],
+            "edges": list(map(tuple, edges.tolist())),
+        }
+
     def __get_object_name(self, current_group_name: str, current_object_name=None) -> str:
         if (
             current_object_name is not None
-            and current_object_name not in self.__objects
+            and current_object_name not in self.__used_names
         ):
-            return current_object_name
-        return current_group_name
+            name = current_object_name
+        else:
+            name = current_group_name
+        self.__used_names.add(name)
+        return name
 
     def __create_vertex(self, str_coordinates: str) -> None:
-        self.__vertices.append([float(k) for k in str_coordinates])
-
-    def __create_point(
-        self, v_number_str: str, current_color: str, current_name: str
-    ) -> None:
-        vertex_number = int(v_number_str) - 1
-        point = {
+        if self.__n_vertices == len(self.__vertices):
+            vertices = np.empty((2 * len(self.__vertices), 3))
+            vertices[:self.__n_vertices] = self.__vertices
+            self.__vertices = vertices
+        self.__vertices[self.__n_vertices] = [float(k) for k in str_coordinates[:3]]
+        self.__n_vertices += 1
+
+    def __get_vertex_index(self, v_number_str: str) -> int:
+        # Indices start at 1, negative ones are relative to the last vertex
+        vertex_number = int(v_number_str.split("/")[0])
+        return vertex_number - 1 if vertex_number > 0 else self.__n_vertices + vertex_number
+
+    def __create_point(self, v_number_str: str, current_color: str) -> dict:
+        vertex_number = self.__get_vertex_index(v_number_str)
+        return {
             "type": "point",
             "color": current_color,
-            "coordinates": [self.__vertices[vertex_number]],
+            "coordinates": self.__vertices[[vertex_number]],
         }
-        self.__objects[current_name] = point
 
-    def __create_line_or_wireframe(
-        self,
-        str_vertices: str,
-        current_color: str,
-        current_name: str,
-    ) -> None:
-
-        vertices_numbers = [
-            int(k) - 1 if "-" not in k else int(k) for k in str_vertices
-        ]
-        obj_vertices = [self.__vertices[i] for i in vertices_numbers]
-        obj_type = "line" if len(obj_vertices) == 2 else "wireframe"
+    def __create_line_or_wireframe(self, str_vertices: str, current_color: str) -> dict:
+        vertices_numbers = [self.__get_vertex_index(k) for k in str_vertices]
+        obj_type = "line" if len(vertices_numbers) == 2 else "wireframe"
 
         # Se for wireframe, a 1 coordenada é igual a última
         if obj_type == "wireframe":
-            obj_vertices.pop()
-
-        obj = {"type": obj_type, "color": current_color, "coordinates": obj_vertices}
+            vertices_numbers.pop()
 
-        self.__objects[current_name] = obj
+        return {
+            "type": obj_type,
+            "color": current_color,
+            "coordinates": self.__vertices[vertices_numbers],
+        }
 
     def __add_face_to_current_group(
         self, str_vertices: str, current_color: str, current_name: str
     ) -> None:
-
-        vertices_numbers = [
-            int(k) - 1 if "-" not in k else int(k) for k in str_vertices
-        ]
-
-        obj_vertices = [tuple(self.__vertices[i]) for i in vertices_numbers]
-
-        if current_name in self.__objects:
-            vertices_not_already_in = list(
-                set(obj_vertices).difference(
-                    set(self.__objects[current_name]["coordinates"])
-                )
-            )
-            self.__objects[current_name]["coordinates"].extend(vertices_not_already_in)
-            current_vertices = self.__objects[current_name]["coordinates"]
-
-            obj_edges = self.__get_edges_with_current_index_list(current_vertices, vertices_numbers)
-            self.__objects[current_name]["edges"].extend(obj_edges)
-            return
-
-        current_vertices = obj_vertices
-        obj_edges = self.__get_edges_with_current_index_list(obj_vertices, vertices_numbers)
-
-        obj = {
-            "type": "faced_obj",
-            "color": current_color,
-            "coordinates": obj_vertices,
-            "edges": obj_edges,
-        }
-        self.__objects[current_name] = obj
-
-    def __get_edges_with_current_index_list(self, current_vertices_list: list[tuple[float]], out_of_date_indexes: list[int]) -> list:
-        vertex_map = {vertex: index for index, vertex in enumerate(current_vertices_list)}
-
-        obj_edges = [
-            (
-                vertex_map[tuple(self.__vertices[out_of_date_indexes[i]])],
-                vertex_map[tuple(self.__vertices[out_of_date_indexes[i + 1]])]
-            )
-            for i in range(len(out_of_date_indexes) - 1)
-        ]
-        obj_edges.append(
-            (
-                vertex_map[tuple(self.__vertices[out_of_date_indexes[-1]])],
-                vertex_map[tuple(self.__vertices[out_of_date_indexes[0]])]
-            )
-        )
-        return obj_edges
+        faces = self.__faced_objects.get(current_name)
+        if faces is None:
+            # Number (from 1) of every face vertex and the size of each face
+            faces = {"color": current_color, "vertices": array("q"), "sizes": array("q")}
+            self.__faced_objects[current_name] = faces
+        self.__open_objects[current_name] = None
+        if current_name in self.__closed_objects:
+            self.__reopened_objects[current_name] = None
+
+        # Same as __get_vertex_index, without a call for every vertex
+        numbers = [int(k.split("/", 1)[0]) for k in str_vertices]
+        if min(numbers) < 0:
+            numbers = [k if k > 0 else self.__n_vertices + k + 1 for k in numbers]
+        faces["vertices"].extend(numbers)
+        faces["sizes"].append(len(str_vertices))
 
     def __get_hex_from_rgb(self, rgb: list[float]) -> str:
         rgb_tuple = tuple(int(x * 255) for x in rgb)
@@ -185,19 +236,17 @@ class OBJParser:
         new_file_path = path.join(directory_path, mtl_filename)
 
         with open(new_file_path, "r") as f:
-            lines = f.readlines()
-
-        for line in lines:
-            if not line.strip():  # line is empty
-                continue
-
-            elements = line.split()
-            if elements[0] == "newmtl":
-                current_element = elements[1]
-            elif elements[0] == "Kd":
-                self.__mtl_elements[current_element] = self.__get_hex_from_rgb(
-                    [float(k) for k in elements[1:]]
-                )
+            for line in f:
+                elements = line.split()
+                if not elements:  # line is empty
+                    continue
+
+                if elements[0] == "newmtl":
+                    current_element = elements[1]
+                elif elements[0] == "Kd":
+                    self.__mtl_elements[current_element] = self.__get_hex_from_rgb(
+                        [float(k) for k in elements[1:]]
+                    )
 
 
 class OBJGenerator:
@@ -213,6 +262,7 @@ class OBJGenerator:
                 f.write(f"Kd {key}\n")
 
     def __choose_file_name(self) -> str:
+        from tkinter import filedialog
         return filedialog.asksaveasfilename(
             title="Open a .obj file",
             filetypes=[("Wavefront OBJ", "*.obj")],
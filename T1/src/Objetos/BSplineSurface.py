@@ -1,9 +1,18 @@
 import math
 from src.Objetos.Objeto3D import Objeto3D, ObjectType
+from src.Objetos.Tessellation import (BSPLINE_MATRIX, bspline_basis, steps_for_tolerance,
+                                      surface_second_derivative_bound)
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 
 
 class BSplineSurface(Objeto3D):
+    # Memory for the patches evaluated at once
+    CHUNK_BYTES = 16 * 2**20
+    # Memory for the isolines of the whole surface, in homogeneous
+    # coordinates: past it the density falls as the grid grows
+    OUTPUT_BYTES = 256 * 2**20
+
     def __init__(
         self,
         name: str,
@@ -17,95 +26,122 @@ class BSplineSurface(Objeto3D):
             new_coords.extend(curve)
         super().__init__(name, new_coords, obj_type, color, curves)
 
-        self.__MBS = (
-            np.array([[-1, 3, -3, 1], [3, -6, 3, 0], [-3, 0, 3, 0], [1, 4, 1, 0]]) / 6
-        )
-
-    def generate_curves(self, ctrl_pts_) -> list[list[list[float]]]:
-        NN = len(ctrl_pts_)
-        n_root = int(math.sqrt(NN))
-        if n_root < 4 or n_root > 20:
-            raise ValueError("The control points matrix must be between 4x4 and 20x20 in size")
-
-        if n_root**2 != NN:
+        # Steps in each direction of a patch
+        self.__n_points = 20
+        self.__second_derivative_bound = None
+        self.__piece_indices = None
+        self.__clamp_reported = False
+
+    @property
+    def tessellation_density(self) -> int:
+        return self.__clamp_density(self.__n_points)
+
+    @property
+    def max_density(self) -> int:
+        # 2 (n + 1)^2 points of 4 coordinates for each patch
+        n_patches = len(self.piece_indices)
+        points_per_line = math.isqrt(self.OUTPUT_BYTES // (2 * 4 * 8 * max(n_patches, 1)))
+        return max(points_per_line - 1, 2)
+
+    def __clamp_density(self, density: int) -> int:
+        # Large grids are drawn coarser than asked, said once per surface
+        max_density = self.max_density
+        if density <= max_density:
+            return density
+        if not self.__clamp_reported:
+            self.__clamp_reported = True
+            n_root = math.isqrt(len(self))
+            print(f"B-spline surface {self.name}: {n_root}x{n_root} control points, "
+                  f"drawn with {max_density} steps per patch instead of {density}")
+        return max_density
+
+    @property
+    def second_derivative_bound(self) -> float:
+        # Of the local surface, computed once, a few rows of patches at a time
+        if self.__second_derivative_bound is None:
+            windows = self.__windows(self.local_coordinates[:, :3])
+            n_columns = windows.shape[1]
+            rows_per_chunk = max(1, self.CHUNK_BYTES // (16 * 3 * 8 * n_columns))
+            bound = 0.0
+            for row in range(0, windows.shape[0], rows_per_chunk):
+                G = windows[row:row + rows_per_chunk].reshape(-1, 3, 4, 4)
+                coefficients = np.einsum("ik,pdkl,jl->pijd", BSPLINE_MATRIX, G, BSPLINE_MATRIX)
+                bound = max(bound, surface_second_derivative_bound(coefficients))
+            self.__second_derivative_bound = bound
+        return self.__second_derivative_bound
+
+    def density_for_tolerance(self, tolerance: float) -> int:
+        # The grid steps are 1 / (n - 1)
+        return self.__clamp_density(steps_for_tolerance(self.second_derivative_bound,
+                                                        tolerance) + 1)
+
+    @property
+    def piece_indices(self) -> np.ndarray:
+        # (P, 16) control points of each patch, row by row
+        if self.__piece_indices is None:
+            n_root = self.__grid_size(len(self))
+            grid = np.arange(n_root * n_root).reshape(n_root, n_root)
+            self.__piece_indices = sliding_window_view(grid, (4, 4)).reshape(-1, 16)
+        return self.__piece_indices
+
+    def generate_pieces(self, control_points, density: int = None,
+                        pieces: np.ndarray = None) -> np.ndarray:
+        # (K, 2 (n + 1), n + 1, D): the s-isolines and then the t-isolines
+        # of each of the asked patches
+        return self.__generate_patches_curves(self.__windows(control_points), density, pieces)
+
+    def __grid_size(self, n_points: int) -> int:
+        # Side of the (n_root x n_root) grid of control points
+        n_root = math.isqrt(n_points)
+        if n_root < 4:
+            raise ValueError("The control points matrix must be at least 4x4 in size")
+
+        if n_root**2 != n_points:
             raise ValueError("The number of control points is not a perfect square")
-
-        curves = []
-        for i in range(n_root - 3):
-            for j in range(n_root - 3):
-                submatrix = []
-                for k in range(4):
-                    row_start = (i + k) * n_root + j
-                    row_end = row_start + 4
-                    submatrix.append(ctrl_pts_[row_start:row_end])
-                curves.extend(self.generate_curve(np.array(submatrix)))
+        return n_root
+
+    def __windows(self, ctrl_pts_) -> np.ndarray:
+        # (n_root - 3, n_root - 3, D, 4, 4) view, [i, j, :, k, l] is the
+        # point (i + k, j + l): the patches are never copied all at once
+        ctrl_pts = np.asarray(ctrl_pts_, dtype=float)
+        n_root = math.isqrt(len(ctrl_pts))
+        grid = ctrl_pts.reshape(n_root, n_root, ctrl_pts.shape[-1])
+        return sliding_window_view(grid, (4, 4), axis=(0, 1))
+
+    @staticmethod
+    def evaluate_pieces(piece_points: np.ndarray, density: int) -> np.ndarray:
+        # piece_points: (K, 16, D) control points of each patch, row by row
+        G = piece_points.reshape(len(piece_points), 4, 4, piece_points.shape[-1])
+        curves = np.empty((len(G), 2 * (density + 1), density + 1, G.shape[-1]))
+        BSplineSurface.__fill_isolines(G.transpose(0, 3, 1, 2), density, curves)
         return curves
 
-    def generate_curve(self, ctrl_points) -> list[list[list[float]]]:
-        points = []
-
-        NS = NT = 20
-        DS = 1.0 / (NS - 1)
-        DT = 1.0 / (NT - 1)
-
-        E_s = self.__get_delta_matrix(DS)
-        E_t = self.__get_delta_matrix(DT).transpose()
-
-        G = np.array(ctrl_points)
-        g_x, g_y = G[:, :, 0], G[:, :, 1]
-
-        c_x = self.__MBS @ g_x @ self.__MBS.transpose()
-        c_y = self.__MBS @ g_y @ self.__MBS.transpose()
-
-        DDx = E_s @ c_x @ E_t
-        DDy = E_s @ c_y @ E_t
-
-        DDx2 = np.copy(DDx).T
-        DDy2 = np.copy(DDy).T
-
-        points.extend(self.__create_subcurve(DDx, DDy, NS, NT))
-        points.extend(self.__create_subcurve(DDx2, DDy2, NT, NS))
-
-        return points
-
-    def __fwd_diff(
-        self, n, x, dx, d2x, d3x, y, dy, d2y, d3y
-    ) -> list[tuple[float, float]]:
-        points = [(x, y)]
-
-        for _ in range(n):
-            x += dx
-            dx += d2x
-            d2x += d3x
-
-            y += dy
-            dy += d2y
-            d2y += d3y
-            points.append((x, y))
-
-        return points
-
-    def __get_delta_matrix(self, d: float) -> np.ndarray:
-        return np.array(
-            [
-                [0, 0, 0, 1],
-                [d**3, d**2, d, 0],
-                [6 * d**3, 2 * d**2, 0, 0],
-                [6 * d**3, 0, 0, 0],
-            ]
-        )
-
-    def __create_subcurve(
-        self, DDx: np.ndarray, DDy: np.ndarray, main_n: int, minor_n: int
-    ) -> list[list[tuple[float, float]]]:
-        coordinates = []
-
-        for _ in range(main_n + 1):
-            coordinates.append(self.__fwd_diff(minor_n, *DDx[0], *DDy[0]))
-
-            for i in range(len(DDx) - 1):
-                for j in range(len(DDx[0])):
-                    DDx[i][j] += DDx[i + 1][j]
-                    DDy[i][j] += DDy[i + 1][j]
-
-        return coordinates
+    @staticmethod
+    def __fill_isolines(G: np.ndarray, density: int, curves: np.ndarray) -> None:
+        # G: (K, D, 4, 4). Each patch is evaluated in a (n + 1, n + 1) grid,
+        # with s and t = k / (n - 1) for k = 0..n (as the forward
+        # differences did), the columns of the grid are the t-isolines
+        B = bspline_basis(density, 1.0 / (density - 1))
+        grids = np.einsum("ak,pdkl,bl->pabd", B, G, B, optimize=True)
+        curves[:, :density + 1] = grids
+        curves[:, density + 1:] = grids.swapaxes(1, 2)
+
+    def __generate_patches_curves(self, windows: np.ndarray, density: int = None,
+                                  pieces: np.ndarray = None) -> np.ndarray:
+        # windows: (R, C, D, 4, 4), R rows of C patches, pieces: flat
+        # index of the patches to evaluate (all by default)
+        NS = self.tessellation_density if density is None else density
+        n_rows, n_columns, D = windows.shape[:3]
+        if pieces is None:
+            pieces = np.arange(n_rows * n_columns)
+
+        curves = np.empty((len(pieces), 2 * (NS + 1), NS + 1, D))
+        # A few patches at a time, so the gathered control points and the
+        # contraction stay within CHUNK_BYTES
+        patch_bytes = (NS + 1) ** 2 * D * curves.itemsize
+        patches_per_chunk = max(1, self.CHUNK_BYTES // patch_bytes)
+        for start in range(0, len(pieces), patches_per_chunk):
+            rows, columns = np.divmod(pieces[start:start + patches_per_chunk], n_columns)
+            G = windows[rows, columns]
+            self.__fill_isolines(G, NS, curves[start:start + len(G)])
+        return curves
@@ -1,5 +1,7 @@
 import math
 from src.Objetos.Objeto3D import Objeto3D, ObjectType
+from src.Objetos.Tessellation import (BEZIER_MATRIX, bezier_basis, steps_for_tolerance,
+                                      surface_second_derivative_bound)
 import numpy as np
 
 """
@@ -11,6 +13,8 @@ O clipping é em 2D.
 """
 
 class BezierSurface(Objeto3D):
+    MB = BEZIER_MATRIX
+
     def __init__(self, name: str, coords: list[list[tuple[float]]],
                  obj_type=ObjectType.BEZIER_SURFACE, color="#000000",
                  curves: list[tuple[int]]=[]):
@@ -20,73 +24,53 @@ class BezierSurface(Objeto3D):
         super().__init__(name, new_coords, obj_type, color, curves)
         
         self.__G = np.array([np.array(c) for c in coords])
-        self.__MB = np.array(
-            [
-             [-1, 3, -3, 1],
-             [3, -6, 3, 0],
-             [-3, 3, 0, 0],
-             [1, 0, 0, 0]
-            ]
-        )
         self.__n_points = 50
+        self.__second_derivative_bound = None
+        self.__piece_indices = None
 
-    def generate_curves(self, ctrl_pts_) -> list[list[list[float]]]:
-        if len(ctrl_pts_) % 16 != 0:
-            raise ValueError("The number of control points must be divisible by 16.")
-
-        curves_list = []
-        for i in range(0, len(ctrl_pts_), 16):
-            current_curve = ctrl_pts_[i: i + 16]
-            ctrl_pts = []
-            for i in range(4):
-                curve = [np.array(current_curve[i*4 + j]) for j in range(4)]
-                ctrl_pts.append(np.array(curve))
-
-            ctrl_pts = np.array(ctrl_pts)
-            curves_list.extend(self.generate_curve(ctrl_pts))
-        return curves_list
-
-    def generate_curve(self, ctrl_pts:np.array) -> list[list[float]]:
-        curve_pieces = []
-        # The groups overlap to give the curve continuity
-        N = len(ctrl_pts)
-        L = N - 2 - (N - 1) % 3
-        for i in range(0, N, 4):
-            sub_matrix = np.array([curve[i:i+4] for curve in ctrl_pts[i : i + 4]])
-            curve_pieces.extend(
-                self.calculate_piece(sub_matrix)
-            )
-            curve_pieces.extend(
-                self.calculate_piece(sub_matrix.transpose(1, 0, 2))
-            )
-        return curve_pieces
-
-
-    def calculate_piece(self, G:np.array) -> list[list[float]]:
-        param_values = np.linspace(0, 1, self.__n_points)
-        sub_curves = []
-        for s in param_values:
-            sub_curve = []
-            for t in param_values:
-                sub_curve.append(self.Q(s, t, G))
-            sub_curves.append(sub_curve)    
-        return sub_curves
+    @property
+    def tessellation_density(self) -> int:
+        return self.__n_points
 
+    @property
+    def second_derivative_bound(self) -> float:
+        # Of the local surface, computed once
+        if self.__second_derivative_bound is None:
+            G = self.local_coordinates[:, :3].reshape(-1, 4, 4, 3)
+            coefficients = np.einsum("ik,pkld,jl->pijd", self.MB, G, self.MB)
+            self.__second_derivative_bound = surface_second_derivative_bound(coefficients)
+        return self.__second_derivative_bound
 
-    def Q(self, s:float, t:float, G:np.array) -> list[float]:
-        S = self.params(s)
-        SMB = np.matmul(S, self.__MB)
-        TT = self.params(t)
-        MTT = np.matmul(self.__MB.transpose(), TT)
-        x = SMB @ G[:, :, 0] @ MTT
-        y = SMB @ G[:, :, 1] @ MTT
-        return x, y
+    def density_for_tolerance(self, tolerance: float) -> int:
+        # Points per isoline for chords at most tolerance away from the surface
+        return steps_for_tolerance(self.second_derivative_bound, tolerance) + 1
 
+    @property
+    def piece_indices(self) -> np.ndarray:
+        # (P, 16), patch p has the points 16 p to 16 p + 15
+        if self.__piece_indices is None:
+            self.__piece_indices = np.arange(len(self) // 16 * 16).reshape(-1, 16)
+        return self.__piece_indices
 
-    def params(self, u: float, N=4):
-        array = [u**j for j in range(N-1, -1, -1)]
-        return np.array(array)
+    def generate_pieces(self, control_points, density: int = None,
+                        pieces: np.ndarray = None) -> np.ndarray:
+        # (K, 2 n, n, D): the n s-isolines and the n t-isolines of each
+        # of the asked patches, in this order
+        ctrl_pts = np.asarray(control_points, dtype=float)
+        patches = ctrl_pts[:len(ctrl_pts) // 16 * 16].reshape(-1, 16, ctrl_pts.shape[-1])
+        if pieces is not None:
+            patches = patches[pieces]
+        return self.evaluate_pieces(patches, self.__n_points if density is None else density)
 
+    @staticmethod
+    def evaluate_pieces(piece_points: np.ndarray, density: int) -> np.ndarray:
+        # piece_points: (K, 16, D) control points of each patch, one row
+        # of G every 4 points. Q = S M G Mt Tt for every s and t at once,
+        # with S M and T M the same (n, 4) table
+        G = piece_points.reshape(len(piece_points), 4, 4, piece_points.shape[-1])
+        B = bezier_basis(density)
+        grids = (B @ G.transpose(0, 3, 1, 2) @ B.T).transpose(0, 2, 3, 1)
+        return np.concatenate([grids, grids.swapaxes(1, 2)], axis=1)
 
     @property
     def curves(self):
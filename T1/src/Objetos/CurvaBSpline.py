@@ -1,4 +1,6 @@
 from src.Objetos.Objeto3D import Objeto3D, ObjectType
+from src.Objetos.Tessellation import (BSPLINE_MATRIX, bspline_basis, steps_for_tolerance,
+                                      curve_second_derivative_bound)
 import numpy as np
 
 
@@ -14,51 +16,47 @@ class CurvaBSpline(Objeto3D):
 
         # As coordenadas guardadas são os pontos de controle
 
-        self.__MBS = (
-            np.array([[-1, 3, -3, 1],
-                      [3, -6, 3, 0],
-                      [-3, 0, 3, 0],
-                      [1, 4, 1, 0]]) / 6
-        )
-
         self.__delta = 0.1
         self.__n = int(1 / self.__delta)
-
-        self.__e_forward_differences = np.array(
-            [
-                [0, 0, 0, 1],
-                [self.__delta**3, self.__delta**2, self.__delta, 0],
-                [6 * self.__delta**3, 2 * self.__delta**2, 0, 0],
-                [6 * self.__delta**3, 0, 0, 0],
-            ]
-        )
-
-    def generate_curve(self, control_points_normalized):
-        points = []
-        for i in range(len(control_points_normalized) - 3):
-            g_x, g_y = np.array(control_points_normalized[i:i+4]).T
-
-            c_x = np.matmul(self.__MBS, g_x)
-            c_y = np.matmul(self.__MBS, g_y)
-
-            x, dx, d2x, d3x = np.matmul(self.__e_forward_differences, c_x)
-            y, dy, d2y, d3y = np.matmul(self.__e_forward_differences, c_y)
-
-            points.extend(self.__fwd_diff(x, dx, d2x, d3x, y, dy, d2y, d3y))
-
-        return points
-    
-    def __fwd_diff(self, x, dx, d2x, d3x, y, dy, d2y, d3y) -> list[tuple[float, float]]:
-        points = [(x, y)]
-
-        for _ in range(self.__n):
-            x += dx
-            dx += d2x
-            d2x += d3x
-
-            y += dy
-            dy += d2y
-            d2y += d3y 
-            points.append((x, y))
-
-        return points
+        self.__second_derivative_bound = None
+        self.__piece_indices = None
+
+    @property
+    def tessellation_density(self) -> int:
+        # Steps per segment
+        return self.__n
+
+    @property
+    def second_derivative_bound(self) -> float:
+        # Of the local curve, computed once
+        if self.__second_derivative_bound is None:
+            coefficients = BSPLINE_MATRIX @ self.local_coordinates[self.piece_indices, :3]
+            self.__second_derivative_bound = curve_second_derivative_bound(coefficients)
+        return self.__second_derivative_bound
+
+    def density_for_tolerance(self, tolerance: float) -> int:
+        # Steps per segment for chords at most tolerance away from the curve
+        return steps_for_tolerance(self.second_derivative_bound, tolerance)
+
+    @property
+    def piece_indices(self) -> np.ndarray:
+        # (S, 4) control points of each segment, segment s uses s to s + 3
+        if self.__piece_indices is None:
+            n_segments = max(len(self) - 3, 0)
+            self.__piece_indices = np.arange(n_segments)[:, None] + np.arange(4)
+        return self.__piece_indices
+
+    def generate_pieces(self, control_points, density: int = None,
+                        pieces: np.ndarray = None) -> np.ndarray:
+        # (K, 1, n + 1, D): each of the asked segments as a polyline,
+        # evaluated directly instead of by forward differences
+        n = self.__n if density is None else density
+        control_points = np.asarray(control_points, dtype=float)
+        indices = self.piece_indices if pieces is None else self.piece_indices[pieces]
+        return self.evaluate_pieces(control_points[indices], n)
+
+    @staticmethod
+    def evaluate_pieces(piece_points: np.ndarray, density: int) -> np.ndarray:
+        # piece_points: (K, 4, D) control points of each segment.
+        # (n + 1, 4) @ (K, 4, D): every segment with a single matmul
+        return (bspline_basis(density, 1 / density) @ piece_points)[:, None]
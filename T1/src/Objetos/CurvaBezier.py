@@ -1,4 +1,6 @@
 from src.Objetos.Objeto3D import Objeto3D, ObjectType
+from src.Objetos.Tessellation import (BEZIER_MATRIX, bezier_basis, steps_for_tolerance,
+                                      curve_second_derivative_bound)
 import numpy as np
 
 
@@ -9,38 +11,47 @@ class CurvaBezier(Objeto3D):
 
         # As coordenadas guardadas são os pontos de controle
 
-        self.__MB = np.array(
-            [
-             [-1, 3, -3, 1],
-             [3, -6, 3, 0],
-             [-3, 3, 0, 0],
-             [1, 0, 0, 0]
-            ]
-        )
-
-    def generate_curve(self, control_points_normalized):
-        curve_pieces = []
-        # The groups overlap to give the curve continuity
-        N = len(control_points_normalized)
-        for i in range(0, N - 2 - (N - 1) % 3, 3):
-            curve_pieces.extend(
-                self.__calculate_curve_piece(np.array(control_points_normalized[i : i + 4]))
-            )
-
-        return curve_pieces
-
-    def __calculate_curve_piece(self, control_points: np.array, point_number=100):
-        sub_curve = []
-        t_values = np.linspace(0, 1, point_number)
-
-        for t in t_values:
-            T = np.array([t**3, t**2, t, 1])
-            T_MB = np.matmul(T, self.__MB)
-
-            # Multiply the TM_b by the x coordinates in control points
-            x = np.matmul(T_MB, control_points[:, 0])
-            # Multiply the TM_b by the y coordinates in control points
-            y = np.matmul(T_MB, control_points[:, 1])
-            sub_curve.append([x, y])
-
-        return sub_curve
+        # Points per segment
+        self.__n_points = 100
+        self.__second_derivative_bound = None
+        self.__piece_indices = None
+
+    @property
+    def tessellation_density(self) -> int:
+        return self.__n_points
+
+    @property
+    def second_derivative_bound(self) -> float:
+        # Of the local curve, computed once
+        if self.__second_derivative_bound is None:
+            coefficients = BEZIER_MATRIX @ self.local_coordinates[self.piece_indices, :3]
+            self.__second_derivative_bound = curve_second_derivative_bound(coefficients)
+        return self.__second_derivative_bound
+
+    def density_for_tolerance(self, tolerance: float) -> int:
+        # Points per segment for chords at most tolerance away from the curve
+        return steps_for_tolerance(self.second_derivative_bound, tolerance) + 1
+
+    @property
+    def piece_indices(self) -> np.ndarray:
+        # (S, 4) control points of each segment. The groups overlap to give
+        # the curve continuity: segment s has the points 3 s to 3 s + 3
+        if self.__piece_indices is None:
+            n_segments = max(len(self) - 1, 0) // 3
+            self.__piece_indices = 3 * np.arange(n_segments)[:, None] + np.arange(4)
+        return self.__piece_indices
+
+    def generate_pieces(self, control_points, density: int = None,
+                        pieces: np.ndarray = None) -> np.ndarray:
+        # (K, 1, n, D): each of the asked segments as a polyline
+        if density is None:
+            density = self.__n_points
+        control_points = np.asarray(control_points, dtype=float)
+        indices = self.piece_indices if pieces is None else self.piece_indices[pieces]
+        return self.evaluate_pieces(control_points[indices], density)
+
+    @staticmethod
+    def evaluate_pieces(piece_points: np.ndarray, density: int) -> np.ndarray:
+        # piece_points: (K, 4, D) control points of each segment.
+        # (n, 4) @ (K, 4, D): every segment with a single matmul
+        return (bezier_basis(density) @ piece_points)[:, None]
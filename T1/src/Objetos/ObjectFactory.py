@@ -0,0 +1,42 @@
+import numpy as np
+
+from src.Objetos import Objeto3D as Obj3D
+from src.Objetos import Ponto3D as P3D
+from src.Objetos import Linha3D as L3D
+from src.Objetos import WireFrame as WF
+from src.Objetos import CurvaBezier as BC
+from src.Objetos import CurvaBSpline as BSC
+from src.Objetos import BezierSurface as BBC
+from src.Objetos import BSplineSurface as BSB
+
+
+def create_object(name, coords, color, fill=False,
+                  obj_type: int=Obj3D.ObjectType.OBJECT3D.value, edges=[]) -> Obj3D.Objeto3D:
+    if obj_type == Obj3D.ObjectType.BEZIER_CURVE.value:
+        output = BC.CurvaBezier(name, coords, color=color)
+    elif obj_type == Obj3D.ObjectType.BSPLINE_CURVE.value:
+        output = BSC.CurvaBSpline(name, coords, color=color)
+    elif obj_type == Obj3D.ObjectType.BEZIER_SURFACE.value:
+        output = BBC.BezierSurface(name, coords, color=color)
+    elif obj_type == Obj3D.ObjectType.BSPLINE_SURFACE.value:
+        output = BSB.BSplineSurface(name, coords, color=color)
+    elif len(coords) == 1:
+        output = P3D.Ponto3D(name, coords, color=color)
+    elif len(coords) == 2:
+        output = L3D.Linha3D(name, coords, color=color)
+    else:
+        output = WF.WireFrame(name, coords, color=color, fill=fill, edges=edges)
+    return output
+
+
+def create_object_from_obj(name: str, value: dict) -> Obj3D.Objeto3D:
+    # value: one of the objects built by OBJParser
+    # Convert the array of 3D coordinates in a list of tuples
+    coords = [tuple(coord) for coord in np.asarray(value["coordinates"], dtype=float).tolist()]
+    edges = value["edges"] if value["type"] == "faced_obj" else []
+    return create_object(name=name, coords=coords, color=value["color"], edges=edges)
+
+
+def create_objects_from_obj(objects: dict) -> list[Obj3D.Objeto3D]:
+    # objects: the dictionary built by OBJParser
+    return [create_object_from_obj(name, value) for name, value in objects.items()]
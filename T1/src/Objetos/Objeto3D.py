@@ -1,5 +1,6 @@
 import numpy as np
 from enum import Enum
+from itertools import count
 from random import randint
 from abc import ABC
 from src.TransformationUtils.Transformations import Rotation3DType, Transformation
@@ -16,6 +17,8 @@ class ObjectType(Enum):
 
 
 class Objeto3D(ABC):
+    __ids = count()
+
     def __init__(self, name: str, coords: list[tuple[float]],
                  obj_type=ObjectType.OBJECT3D.value, color="#000000",
                  edges:list[tuple[int]] = []):
@@ -23,8 +26,28 @@ class Objeto3D(ABC):
         self.__coords = None
         self.__obj_type = None
         self.certify_format(name, coords, obj_type)
+        # The transformations are accumulated in the model matrix,
+        # the world coordinates are only calculated when someone needs them
+        self.__model_matrix = np.identity(4)
+        self.__world_coords = self.__coords
+        self.__local_center = np.mean(self.__coords, axis=0)
+        # Corners of the local AABB, the world AABB comes from them
+        local_min, local_max = self.__coords[:, :3].min(axis=0), self.__coords[:, :3].max(axis=0)
+        self.__local_corners = self.to_homogeneous(
+            np.array([[(local_min, local_max)[i >> k & 1][k] for k in range(3)]
+                      for i in range(8)]))
+        self.__world_bbox = None
+        self.__version = 0
+        # The local coordinates never change after this, so whatever is
+        # computed from them alone can be cached under this key
+        self.__geometry_key = next(Objeto3D.__ids)
+        # Normalized AABB of the last projection, valid for one
+        # (object version, view version) pair
+        self.__normalized_bbox = None
+        self.__normalized_bbox_key = None
         self.__color = color
         self.__edges = edges
+        self.__rings = None
         self.__edge_order_matter = True
         if not self.__edges:
             self.__edge_order_matter = False
@@ -33,7 +56,7 @@ class Objeto3D(ABC):
 
     def translation(self, dx: float, dy: float, dz: float=0) -> None:
         matrix = self.get_translation_matrix(dx, dy, dz)
-        self.__coords = self.calculate_coords(matrix)
+        self.__compose(matrix)
 
     def scaling(self, sx: float, sy: float, sz:float=0) -> None:
         cx, cy, cz = self.geometric_center()
@@ -44,7 +67,7 @@ class Objeto3D(ABC):
         scaling_matrix = np.matmul(temp_matrix,
                                    self.get_translation_matrix(cx, cy, cz))
 
-        self.__coords = self.calculate_coords(scaling_matrix)
+        self.__compose(scaling_matrix)
 
     def rotation(self,
                  rotation_type: str="RotationType.Z",
@@ -77,7 +100,14 @@ class Objeto3D(ABC):
             print("Invalid rotation type")
             return
 
-        self.__coords = self.calculate_coords(matrix)
+        self.__compose(matrix)
+
+    def __compose(self, matrix: np.ndarray) -> None:
+        # Row vectors: the newest transformation is multiplied on the right
+        self.__model_matrix = self.__model_matrix @ matrix
+        self.__world_coords = None
+        self.__world_bbox = None
+        self.__version += 1
 
     def apply_transformations(self, transformations: list[Transformation],
                               transform_vector_function: callable) -> None:
@@ -139,7 +169,16 @@ class Objeto3D(ABC):
         )
 
     def geometric_center(self) -> tuple[float]:
-        return tuple(np.mean(self.__coords, axis=0))
+        # The model matrix is affine, so the center can be transformed directly
+        return tuple((self.__local_center @ self.__model_matrix)[:3])
+
+    def world_bbox(self) -> tuple[np.ndarray, np.ndarray]:
+        # (min xyz, max xyz) of the local box transformed by the model matrix,
+        # it contains the object (and the curves made from its control points)
+        if self.__world_bbox is None:
+            corners = (self.__local_corners @ self.__model_matrix)[:, :3]
+            self.__world_bbox = (corners.min(axis=0), corners.max(axis=0))
+        return self.__world_bbox
 
     def get_vector_angle(self,
                          p1:tuple[float, float, float],
@@ -190,13 +229,67 @@ class Objeto3D(ABC):
 
     @property
     def coordinates(self) -> list[tuple[float]]:
-        coords = self.__convert_to_tuples_list(self.__coords)
+        coords = self.__convert_to_tuples_list(self.homogeneous_coordinates[:, :3])
         return coords
 
+    @property
+    def homogeneous_coordinates(self) -> np.ndarray:
+        if self.__world_coords is None:
+            self.__world_coords = self.__coords @ self.__model_matrix
+        return self.__world_coords
+
+    @property
+    def local_coordinates(self) -> np.ndarray:
+        return self.__coords
+
+    @property
+    def model_matrix(self) -> np.ndarray:
+        return self.__model_matrix
+
+    @property
+    def version(self) -> int:
+        # Incremented every time the model matrix changes
+        return self.__version
+
+    @property
+    def geometry_key(self) -> int:
+        # Unique for every object, unlike id() that can be reused
+        return self.__geometry_key
+
     @property
     def edges(self) -> list[tuple[int]]:
         return self.__edges
 
+    @property
+    def rings(self) -> tuple[list[list[int]], list[list[int]]]:
+        # The edges walked as closed rings (e.g. the faces) and open chains
+        if self.__rings is None:
+            self.__rings = self.edges_to_rings(self.__edges)
+        return self.__rings
+
+    @staticmethod
+    def edges_to_rings(edges: list[tuple[int]]) -> tuple[list[list[int]], list[list[int]]]:
+        # Consecutive edges that share a vertex form a chain, which is a
+        # ring when it gets back to its first vertex
+        rings, chains = [], []
+        chain = []
+        for a, b in edges:
+            if chain and a != chain[-1]:
+                chains.append(chain)
+                chain = []
+            if not chain:
+                chain = [a]
+            chain.append(b)
+            if b == chain[0]:
+                if len(chain) > 3:
+                    rings.append(chain[:-1])
+                else:
+                    chains.append(chain)
+                chain = []
+        if chain:
+            chains.append(chain)
+        return rings, chains
+
     @property
     def obj_type(self) -> str:
         return self.__obj_type
@@ -209,6 +302,9 @@ class Objeto3D(ABC):
     def edge_order_matter(self) -> bool:
         return self.__edge_order_matter
 
+    def __len__(self) -> int:
+        return len(self.__coords)
+
     def __str__(self):
         coords = [tuple(round(i, 2) for i in j) for j in self.coordinates]
         return f"{self.obj_type}: - {self.__name} - {coords}"
@@ -216,29 +312,26 @@ class Objeto3D(ABC):
     def __convert_to_tuples_list(self, coords: np.ndarray) -> list[tuple[float]]:
         return [tuple(float(j) for j in i) for i in coords.tolist()]
 
-    def calculate_coords(self, matrix: np.ndarray) -> list[tuple[float]]:
-        R = np.array(
-            [
-                np.dot(np.array([coord[0], coord[1], coord[2], 1]), matrix)[:-1]
-                for coord in self.__coords
-            ]
-        )
+    def calculate_coords(self, matrix: np.ndarray) -> np.ndarray:
+        # The vertices are kept as one (N, 4) homogeneous array,
+        # so any 4x4 transformation is a single matmul over the whole object
+        return self.__coords @ (self.__model_matrix @ matrix)
 
-        return R
+    @staticmethod
+    def to_homogeneous(coords: np.ndarray) -> np.ndarray:
+        homogeneous = np.ones((len(coords), 4))
+        homogeneous[:, :3] = coords
+        return homogeneous
 
-    def calculate_perspective_normalized_coords(self, d: int, mper: np.ndarray,
-                                                normalize_matrix: np.ndarray):
-        normalized_coords = []
-        for x, y, z in self.__coords:
-            if z < d:
-                print("A coordenada z do objeto é menor do",
-                      f"que o mínimo desenhado (mínimo = {d}, z = {z})")
-                return []
-            x, y, z, w = np.dot(mper, [x, y, z, 1])
-            normalized_coord = np.dot([x / w, y / w, d, 1], normalize_matrix)
-            normalized_coords.append([normalized_coord[0], normalized_coord[1]])
+    def get_normalized_bbox(self, view_version: int) -> tuple[float]:
+        # (x_min, y_min, x_max, y_max), None if the object or the view changed
+        if self.__normalized_bbox_key == (self.__version, view_version):
+            return self.__normalized_bbox
+        return None
 
-        return normalized_coords
+    def set_normalized_bbox(self, view_version: int, bbox: tuple[float]) -> None:
+        self.__normalized_bbox = bbox
+        self.__normalized_bbox_key = (self.__version, view_version)
 
     def certify_format(self, name:str, coords_:list[tuple[float]],
                        obj_type:ObjectType) -> tuple[str, np.array, ObjectType]:
@@ -299,5 +392,5 @@ class Objeto3D(ABC):
                 print("coordinates will be remanaged to (i, i, i)")
                 coords = [(i, i, i) for i in range(len(coords))]
         self.__name = name
-        self.__coords = np.array(coords)
+        self.__coords = self.to_homogeneous(np.array(coords, dtype=float))
         self.__obj_type = obj_type
@@ -0,0 +1,414 @@
+import atexit
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from math import ceil, log2, sqrt
+from multiprocessing import get_context, shared_memory
+
+import numpy as np
+
+
+class TessellationCache:
+    # LRU of the tessellated curves and surfaces, bounded by the bytes of
+    # the arrays it keeps. The curves are tessellated in object space, so
+    # navigating or transforming an object never tessellates it again
+    def __init__(self, max_bytes: int = 64 * 2**20):
+        self.__max_bytes = max_bytes
+        self.__entries = OrderedDict()  # key -> (C, n, 4) array
+        self.__n_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self.__entries
+
+    @property
+    def n_bytes(self) -> int:
+        return self.__n_bytes
+
+    @property
+    def max_bytes(self) -> int:
+        return self.__max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value: int) -> None:
+        self.__max_bytes = value
+        self.__evict()
+
+    def get(self, key) -> np.ndarray:
+        polylines = self.__entries.get(key)
+        if polylines is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.__entries.move_to_end(key)
+        return polylines
+
+    def put(self, key, polylines: np.ndarray) -> None:
+        self.discard(key)
+        # Bigger than the whole cache: used once and not kept
+        if polylines.nbytes > self.__max_bytes:
+            return
+        self.__entries[key] = polylines
+        self.__n_bytes += polylines.nbytes
+        self.__evict()
+
+    def discard(self, key) -> None:
+        polylines = self.__entries.pop(key, None)
+        if polylines is not None:
+            self.__n_bytes -= polylines.nbytes
+
+    def clear(self) -> None:
+        self.__entries.clear()
+        self.__n_bytes = 0
+
+    def __evict(self) -> None:
+        # The least recently used go first
+        while self.__n_bytes > self.__max_bytes:
+            _, polylines = self.__entries.popitem(last=False)
+            self.__n_bytes -= polylines.nbytes
+
+
+# Shared by every curve and surface
+tessellation_cache = TessellationCache()
+
+
+BEZIER_MATRIX = np.array(
+    [
+     [-1, 3, -3, 1],
+     [3, -6, 3, 0],
+     [-3, 3, 0, 0],
+     [1, 0, 0, 0]
+    ]
+)
+_bezier_bases = {}
+# Power basis coefficients to Bezier control points
+_POWER_TO_BEZIER = np.linalg.inv(BEZIER_MATRIX)
+
+
+def bezier_basis(n_points: int) -> np.ndarray:
+    # (n, 4) table of [u^3, u^2, u, 1] MB for n values of u in [0, 1],
+    # computed once for each number of points
+    basis = _bezier_bases.get(n_points)
+    if basis is None:
+        u = np.linspace(0, 1, n_points)
+        U = np.stack([u**3, u**2, u, np.ones_like(u)], axis=1)
+        basis = _bezier_bases[n_points] = U @ BEZIER_MATRIX
+    return basis
+
+
+BSPLINE_MATRIX = np.array(
+    [[-1, 3, -3, 1],
+     [3, -6, 3, 0],
+     [-3, 0, 3, 0],
+     [1, 4, 1, 0]]
+) / 6
+_bspline_bases = {}
+
+
+def bspline_basis(n_steps: int, delta: float) -> np.ndarray:
+    # (n + 1, 4) table of [u^3, u^2, u, 1] MBS for u = k delta, k = 0..n:
+    # the same points the forward differences reach after k steps
+    key = (n_steps, delta)
+    basis = _bspline_bases.get(key)
+    if basis is None:
+        u = np.arange(n_steps + 1) * delta
+        U = np.stack([u**3, u**2, u, np.ones_like(u)], axis=1)
+        basis = _bspline_bases[key] = U @ BSPLINE_MATRIX
+    return basis
+
+
+# Adaptive tessellation: a chord of a step h over a curve with |C''| <= M
+# is at most M h^2 / 8 away from it. The number of steps is rounded up to
+# a power of two, so zooming only changes the density (and misses the
+# cache) once in a while
+MIN_STEPS = 2
+MAX_STEPS = 128
+
+
+def steps_for_tolerance(bound: float, tolerance: float) -> int:
+    if tolerance <= 0:
+        return MAX_STEPS
+    steps = max(sqrt(bound / (8 * tolerance)), 1)
+    return min(max(2 ** ceil(log2(steps)), MIN_STEPS), MAX_STEPS)
+
+
+def curve_second_derivative_bound(coefficients: np.ndarray) -> float:
+    # coefficients: (S, 4, D) of t^3, t^2, t and 1 for each segment.
+    # C'' = 6 a t + 2 b is linear, so it is largest at t = 0 or t = 1
+    if not len(coefficients):
+        return 0.0
+    a, b = coefficients[:, 0], coefficients[:, 1]
+    return float(max(np.linalg.norm(2 * b, axis=-1).max(),
+                     np.linalg.norm(6 * a + 2 * b, axis=-1).max()))
+
+
+def surface_second_derivative_bound(coefficients: np.ndarray) -> float:
+    # coefficients: (P, 4, 4, D) of s^(3 - i) t^(3 - j) for each patch.
+    # Qtt = sum_i s^(3 - i) (6 c_i0 t + 2 c_i1) is linear in t, so it is
+    # largest at t = 0 or t = 1, and there it is a cubic in s that stays
+    # in the hull of its Bezier control points. The same for Qss
+    if not len(coefficients):
+        return 0.0
+    bound = 0.0
+    for c in (coefficients, coefficients.swapaxes(1, 2)):
+        for v in (2 * c[:, :, 1], 6 * c[:, :, 0] + 2 * c[:, :, 1]):
+            control_points = _POWER_TO_BEZIER @ v
+            bound = max(bound, float(np.linalg.norm(control_points, axis=-1).max()))
+    return bound
+
+
+# Segments or patches in each entry of the cache
+TILE_SIZE = 64
+
+
+def _homogeneous(points: np.ndarray) -> np.ndarray:
+    polylines = np.ones((*points.shape[:-1], 4))
+    polylines[..., :3] = points
+    return polylines
+
+
+def _tessellate_tiles_shared(job: tuple) -> None:
+    # Runs in a worker process. It gets the class of the object, the names
+    # of two shared buffers (the control points and the output) and the
+    # control point indices of the pieces of each tile. The tiles are
+    # written straight into the output, so no points go through pickle
+    cls, density, points_name, points_shape, tiles, out_name, out_shape = job
+    points_memory = shared_memory.SharedMemory(name=points_name)
+    out_memory = shared_memory.SharedMemory(name=out_name)
+    try:
+        control_points = np.ndarray(points_shape, buffer=points_memory.buf)
+        out = np.ndarray(out_shape, buffer=out_memory.buf)
+        for start, indices in tiles:
+            out[start:start + len(indices), ..., :3] = cls.evaluate_pieces(control_points[indices],
+                                                                          density)
+        del control_points, out
+    finally:
+        points_memory.close()
+        out_memory.close()
+
+
+class TessellationScheduler:
+    # Tessellates the tiles of large requests in the background, on a pool
+    # of threads (numpy releases the GIL while evaluating) or of processes.
+    # Nothing waits for the pool: submit() returns at once and collect(),
+    # called from the thread that draws, puts the finished tiles in the
+    # cache. The serial scheduler never has anything pending
+    KINDS = ("serial", "thread", "process")
+    # The GUI runs on one of the CPUs, so the pools are kept small
+    MAX_DEFAULT_WORKERS = 4
+
+    def __init__(self, kind: str = "serial", workers: int = None, min_pieces: int = 4 * TILE_SIZE):
+        self.__kind = kind
+        self.__workers = workers or self.__default_workers()
+        # Less pieces than this are tessellated right away
+        self.min_pieces = min_pieces
+        self.__executor = None
+        # (keys, futures, finish, release) of each submitted request
+        self.__pending = []
+        self.__pending_keys = set()
+
+    @property
+    def kind(self) -> str:
+        return self.__kind
+
+    @property
+    def workers(self) -> int:
+        return self.__workers
+
+    @property
+    def pending(self) -> bool:
+        return bool(self.__pending)
+
+    def configure(self, kind: str, workers: int = None) -> None:
+        if kind not in self.KINDS:
+            raise ValueError(f"Invalid tessellation pool {kind}")
+        self.shutdown()
+        self.__kind = kind
+        self.__workers = workers or self.__default_workers()
+
+    def __default_workers(self) -> int:
+        return min(os.cpu_count() or 1, self.MAX_DEFAULT_WORKERS)
+
+    def shutdown(self) -> None:
+        # What was still pending is dropped, it is asked for again when drawn
+        if self.__executor is not None:
+            self.__executor.shutdown(cancel_futures=True)
+            self.__executor = None
+        for _, _, _, release in self.__pending:
+            release()
+        self.__pending = []
+        self.__pending_keys = set()
+
+    def __get_executor(self):
+        if self.__executor is None:
+            if self.__kind == "thread":
+                self.__executor = ThreadPoolExecutor(max_workers=self.__workers)
+            else:
+                # Forking would copy the Tk process into every worker
+                self.__executor = ProcessPoolExecutor(max_workers=self.__workers,
+                                                      mp_context=get_context("spawn"))
+        return self.__executor
+
+    def accepts(self, n_pieces: int) -> bool:
+        # Whether a request of n_pieces goes to the pool
+        return self.__kind != "serial" and n_pieces >= self.min_pieces
+
+    def is_pending(self, key) -> bool:
+        return key in self.__pending_keys
+
+    def tessellate_tiles(self, obj, density: int, tiles: list[np.ndarray]) -> list[np.ndarray]:
+        # (k, L, n, 4) homogeneous polylines of the pieces of each tile,
+        # computed right away in the calling thread
+        control_points = obj.local_coordinates[:, :3]
+        return [_homogeneous(obj.generate_pieces(control_points, density, pieces))
+                for pieces in tiles]
+
+    def submit(self, obj, density: int, tiles: list[np.ndarray], keys: list) -> None:
+        # The tiles are put in the cache under the keys by collect()
+        if self.__kind == "thread":
+            futures = [self.__get_executor().submit(self.tessellate_tiles, obj, density, [pieces])
+                       for pieces in tiles]
+            finish = lambda: [future.result()[0] for future in futures]
+            release = lambda: None
+        else:
+            futures, finish, release = self.__submit_shared(obj, density, tiles)
+        self.__pending.append((keys, futures, finish, release))
+        self.__pending_keys.update(keys)
+
+    def collect(self) -> int:
+        # Puts the tiles of the finished requests in the cache, returns how
+        # many tiles arrived
+        n_tiles = 0
+        pending = []
+        for request in self.__pending:
+            keys, futures, finish, release = request
+            if not all(future.done() for future in futures):
+                pending.append(request)
+                continue
+            try:
+                for key, polylines in zip(keys, finish()):
+                    tessellation_cache.put(key, polylines)
+                n_tiles += len(keys)
+            finally:
+                release()
+                self.__pending_keys.difference_update(keys)
+        self.__pending = pending
+        return n_tiles
+
+    def __submit_shared(self, obj, density: int, tiles: list[np.ndarray]) -> tuple:
+        # Processes: pickling the points would cost about as much as
+        # computing them, so the control points and the output are in
+        # shared buffers and the workers get only the class of the object
+        # and the indices of the pieces. A single piece is evaluated here,
+        # for the shape of the output. The buffers live until release()
+        control_points = obj.local_coordinates[:, :3]
+        first = obj.generate_pieces(control_points, density, tiles[0][:1])
+        n_pieces = sum(len(pieces) for pieces in tiles)
+        shape = (n_pieces, *first.shape[1:-1], 4)
+        points_memory = shared_memory.SharedMemory(create=True, size=control_points.size * 8)
+        out_memory = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 8)
+
+        def release() -> None:
+            for memory in (points_memory, out_memory):
+                memory.close()
+                memory.unlink()
+
+        try:
+            shared_points = np.ndarray(control_points.shape, buffer=points_memory.buf)
+            shared_points[:] = control_points
+            shared = np.ndarray(shape, buffer=out_memory.buf)
+            shared[..., 3] = 1
+            del shared_points, shared
+            starts = np.cumsum([0] + [len(pieces) for pieces in tiles[:-1]]).tolist()
+            indices = [obj.piece_indices[pieces] for pieces in tiles]
+            # A few jobs per worker, so a slow one does not hold the others
+            n_jobs = min(len(tiles), 4 * self.__workers)
+            jobs = [(type(obj), density, points_memory.name, control_points.shape,
+                     list(zip(starts[i::n_jobs], indices[i::n_jobs])), out_memory.name, shape)
+                    for i in range(n_jobs)]
+            futures = [self.__get_executor().submit(_tessellate_tiles_shared, job) for job in jobs]
+        except BaseException:
+            release()
+            raise
+
+        def finish() -> list[np.ndarray]:
+            for future in futures:
+                future.result()
+            shared = np.ndarray(shape, buffer=out_memory.buf)
+            polylines = [shared[start:start + len(pieces)].copy()
+                         for start, pieces in zip(starts, tiles)]
+            del shared
+            return polylines
+
+        return futures, finish, release
+
+
+# Shared by every curve and surface, its pool goes away with the program
+tessellation_scheduler = TessellationScheduler()
+atexit.register(tessellation_scheduler.shutdown)
+
+
+def _tile_pieces(tile: int, n_pieces: int) -> np.ndarray:
+    return np.arange(tile * TILE_SIZE, min((tile + 1) * TILE_SIZE, n_pieces))
+
+
+def request_tessellation(obj, density: int = None, pieces: np.ndarray = None) -> np.ndarray:
+    # Which of the pieces tessellate() gives without waiting. With a pool,
+    # the missing tiles of a large request are sent to it and left out
+    # until collected, the rest is always ready
+    if density is None:
+        density = obj.tessellation_density
+    n_pieces = len(obj.piece_indices)
+    if pieces is None:
+        pieces = np.arange(n_pieces)
+    piece_tiles = pieces // TILE_SIZE
+    tiles = np.unique(piece_tiles).tolist()
+    keys = [(obj.geometry_key, density, tile) for tile in tiles]
+    missing = [i for i, key in enumerate(keys) if key not in tessellation_cache]
+    missing_pieces = [_tile_pieces(tiles[i], n_pieces) for i in missing]
+    if not tessellation_scheduler.accepts(sum(len(tile) for tile in missing_pieces)):
+        return np.ones(len(pieces), dtype=bool)
+
+    submit = [k for k, i in enumerate(missing) if not tessellation_scheduler.is_pending(keys[i])]
+    if submit:
+        tessellation_scheduler.submit(obj, density, [missing_pieces[k] for k in submit],
+                                      [keys[missing[k]] for k in submit])
+    missing_tiles = [tiles[i] for i in missing]
+    return ~np.isin(piece_tiles, missing_tiles)
+
+
+def tessellate(obj, density: int = None, pieces: np.ndarray = None) -> np.ndarray:
+    # Polylines of some pieces (segments of a curve, patches of a surface)
+    # in object space, as a (K, L, n, 4) homogeneous array: L polylines of
+    # n points for each of the K pieces, all of them by default. The model
+    # matrix is applied after, so the cached arrays are valid for every
+    # transformation. The pieces are cached TILE_SIZE at a time, so only
+    # the tiles of the asked pieces are ever tessellated
+    if density is None:
+        density = obj.tessellation_density
+    n_pieces = len(obj.piece_indices)
+    if pieces is None:
+        pieces = np.arange(n_pieces)
+    tiles = np.unique(pieces // TILE_SIZE)
+
+    polylines = [tessellation_cache.get((obj.geometry_key, density, tile)) for tile in tiles.tolist()]
+    missing = [i for i, tile_polylines in enumerate(polylines) if tile_polylines is None]
+    if missing:
+        tile_pieces = [_tile_pieces(tiles[i], n_pieces) for i in missing]
+        computed = tessellation_scheduler.tessellate_tiles(obj, density, tile_pieces)
+        for i, tile_polylines in zip(missing, computed):
+            tessellation_cache.put((obj.geometry_key, density, int(tiles[i])), tile_polylines)
+            polylines[i] = tile_polylines
+
+    if len(polylines) == 1 and len(pieces) == len(polylines[0]):
+        return polylines[0]
+    polylines = np.concatenate(polylines)
+    # Only the last tile can be smaller, so the others start every TILE_SIZE
+    positions = np.searchsorted(tiles, pieces // TILE_SIZE) * TILE_SIZE + pieces % TILE_SIZE
+    if len(positions) == len(polylines) and (positions == np.arange(len(positions))).all():
+        return polylines
+    return polylines[positions]
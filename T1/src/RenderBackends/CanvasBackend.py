@@ -0,0 +1,176 @@
+import tkinter as tk
+import numpy as np
+
+from src.RenderBackends.RenderBackend import RenderBackend
+
+
+class CanvasBackend(RenderBackend):
+    def __init__(self, canvas: tk.Canvas):
+        self.__canvas = canvas
+
+        # Retained mode: the canvas items of each owner (an object, or the
+        # packed scene) are kept between frames and updated in place
+        self.__items = {}  # (owner, kind) -> [item_id, ...]
+        self.__owner_keys = {}  # owner -> [(owner, kind), ...]
+        self.__used = {}  # (owner, kind) -> items used in the current frame
+        self.__styles = {}  # item_id -> options last given to the item
+        self.__hidden = set()
+        # Owners drawn in this frame and in the last one. Owners that are
+        # not drawn (culled) keep their items hidden until they come back
+        self.__touched = set()
+        self.__last_touched = set()
+        self.__owner = None
+        self.__frame = None
+        # Stitching walks the edges in Python, so the chains are kept for
+        # as long as the topology of the segments does not change (views
+        # that only move the points reuse them)
+        self.__chains = {}  # (owner, color) -> (edges, chains)
+
+    def clear(self) -> None:
+        for items in self.__items.values():
+            self.__canvas.delete(*items)
+        if self.__frame is not None:
+            self.__canvas.delete(self.__frame)
+        self.__items.clear()
+        self.__owner_keys.clear()
+        self.__last_touched.clear()
+        self.__used.clear()
+        self.__styles.clear()
+        self.__hidden.clear()
+        self.__chains.clear()
+        self.__frame = None
+
+    def begin_frame(self) -> None:
+        self.__used.clear()
+        self.__last_touched = self.__touched
+        self.__touched = set()
+        self.__owner = None
+
+    def set_owner(self, owner) -> None:
+        # Every item drawn from now on belongs to this owner
+        self.__owner = owner
+        self.__touched.add(owner)
+
+    def end_frame(self) -> None:
+        # Only the owners drawn now or in the last frame can have changed
+        for owner in self.__touched | self.__last_touched:
+            for key in self.__owner_keys.get(owner, []):
+                # Items not used in this frame were clipped away, they are kept for later
+                for item in self.__items[key][self.__used.get(key, 0):]:
+                    if item not in self.__hidden:
+                        self.__canvas.itemconfigure(item, state=tk.HIDDEN)
+                        self.__hidden.add(item)
+        if self.__frame is not None:
+            self.__canvas.tag_raise(self.__frame)
+
+    def forget(self, owner) -> None:
+        # The owner is not in the scene anymore
+        for key in self.__owner_keys.pop(owner, []):
+            items = self.__items.pop(key)
+            self.__canvas.delete(*items)
+            for item in items:
+                self.__styles.pop(item, None)
+                self.__hidden.discard(item)
+        self.__touched.discard(owner)
+        self.__last_touched.discard(owner)
+        for key in [key for key in self.__chains if key[0] == owner]:
+            del self.__chains[key]
+
+    def __draw_item(self, kind: str, coords: list[float], **options) -> None:
+        key = (self.__owner, kind)
+        if key not in self.__items:
+            self.__items[key] = []
+            self.__owner_keys.setdefault(self.__owner, []).append(key)
+        items = self.__items[key]
+        used = self.__used.get(key, 0)
+        self.__used[key] = used + 1
+
+        if used == len(items):
+            item = getattr(self.__canvas, f"create_{kind}")(*coords, **options)
+            items.append(item)
+            self.__styles[item] = options
+            return
+
+        item = items[used]
+        self.__canvas.coords(item, *coords)
+        if item in self.__hidden:
+            options["state"] = tk.NORMAL
+            self.__hidden.discard(item)
+        if options != self.__styles[item]:
+            self.__canvas.itemconfigure(item, **options)
+            options.pop("state", None)
+            self.__styles[item] = options
+
+    def draw_oval(self, x0: float, y0: float, x1: float, y1: float, color: str) -> None:
+        self.__draw_item("oval", [x0, y0, x1, y1], fill=color, outline=color)
+
+    def draw_polyline(self, points: np.ndarray, color: str, width: float) -> None:
+        self.__draw_item("line", np.asarray(points).ravel().tolist(), fill=color, width=width)
+
+    def draw_segments(self, segments: np.ndarray, color: str, width: float) -> None:
+        # Tk items are expensive: the segments are welded by position and
+        # stitched in chains, each chain becomes a single polyline item
+        points, edges = self.__weld_points(segments.reshape(-1, 2),
+                                           np.arange(2 * len(segments)).reshape(-1, 2))
+        key = (self.__owner, color)
+        cached = self.__chains.get(key)
+        if cached is not None and np.array_equal(cached[0], edges):
+            chains = cached[1]
+        else:
+            chains = self.__stitch_edges(edges.tolist())
+            self.__chains[key] = (edges, chains)
+        for chain in chains:
+            self.draw_polyline(points[chain], color, width)
+
+    def draw_polygon(self, points: np.ndarray, color: str, width: float) -> None:
+        self.__draw_item("polygon", np.asarray(points).ravel().tolist(),
+                         fill=color, outline=color, width=width)
+
+    def draw_frame(self, x0: float, y0: float, x1: float, y1: float, color: str) -> None:
+        if self.__frame is None:
+            self.__frame = self.__canvas.create_rectangle(x0, y0, x1, y1, outline=color)
+
+    def __weld_points(self, points: np.ndarray, edges: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # Points at the same position (up to rounding) get the same index.
+        # The indexes follow the first time each point appears, so they
+        # depend on which segments meet and not on where they are
+        if not len(points):
+            return points, edges
+        points, first, inverse = np.unique(np.round(points, 6), axis=0,
+                                           return_index=True, return_inverse=True)
+        order = np.argsort(first)
+        index = np.empty_like(order)
+        index[order] = np.arange(len(order))
+        return points[order], index[inverse.reshape(-1)][edges]
+
+    def __stitch_edges(self, edges: list[tuple[int]]) -> list[list[int]]:
+        # Greedy walk over the edges, every edge is used exactly once.
+        # Walks start at odd degree vertices (ends of open chains) so they
+        # are as long as possible, the closed loops are walked afterwards.
+        adjacency = {}
+        for i, (a, b) in enumerate(edges):
+            if a == b:
+                continue
+            adjacency.setdefault(a, []).append((i, b))
+            adjacency.setdefault(b, []).append((i, a))
+
+        used = [False] * len(edges)
+        starts = [v for v, adj in adjacency.items() if len(adj) % 2] + list(adjacency)
+        chains = []
+        for start in starts:
+            while True:
+                chain = [start]
+                vertex = start
+                while True:
+                    adj = adjacency[vertex]
+                    while adj and used[adj[-1][0]]:
+                        adj.pop()
+                    if not adj:
+                        break
+                    edge, vertex = adj.pop()
+                    used[edge] = True
+                    chain.append(vertex)
+                if len(chain) == 1:
+                    break
+                chains.append(chain)
+        return chains
@@ -0,0 +1,53 @@
+import json
+import numpy as np
+
+from src.RenderBackends.RenderBackend import RenderBackend
+
+
+class DisplayListBackend(RenderBackend):
+    # Records the clipped 2D primitives of a frame instead of drawing them
+
+    def __init__(self, width: int, height: int):
+        self.__width = width
+        self.__height = height
+        self.__primitives = []
+        self.__frame = None
+
+    def begin_frame(self) -> None:
+        self.__primitives = []
+
+    def clear(self) -> None:
+        self.__primitives = []
+
+    def __round(self, points: np.ndarray) -> list:
+        return np.round(np.asarray(points, dtype=float), 3).tolist()
+
+    def draw_oval(self, x0: float, y0: float, x1: float, y1: float, color: str) -> None:
+        self.__primitives.append({"type": "point", "color": color,
+                                  "center": self.__round([(x0 + x1) / 2, (y0 + y1) / 2]),
+                                  "radius": round((x1 - x0) / 2, 3)})
+
+    def draw_polyline(self, points: np.ndarray, color: str, width: float) -> None:
+        self.__primitives.append({"type": "polyline", "color": color, "width": width,
+                                  "points": self.__round(points)})
+
+    def draw_segments(self, segments: np.ndarray, color: str, width: float) -> None:
+        if len(segments):
+            self.__primitives.append({"type": "segments", "color": color, "width": width,
+                                      "segments": self.__round(segments)})
+
+    def draw_polygon(self, points: np.ndarray, color: str, width: float) -> None:
+        self.__primitives.append({"type": "polygon", "color": color, "width": width,
+                                  "points": self.__round(points)})
+
+    def draw_frame(self, x0: float, y0: float, x1: float, y1: float, color: str) -> None:
+        self.__frame = [x0, y0, x1, y1]
+
+    @property
+    def primitives(self) -> list[dict]:
+        return self.__primitives
+
+    def save(self, file_name: str) -> None:
+        with open(file_name, "w", encoding="utf-8") as f:
+            json.dump({"width": self.__width, "height": self.__height,
+                       "viewport": self.__frame, "primitives": self.__primitives}, f)
@@ -0,0 +1,199 @@
+import struct
+import zlib
+import numpy as np
+
+from src.RenderBackends.RenderBackend import RenderBackend
+
+
+class RasterBackend(RenderBackend):
+    NAMED_COLORS = {
+        "black": (0, 0, 0),
+        "white": (255, 255, 255),
+        "red": (255, 0, 0),
+        "green": (0, 128, 0),
+        "blue": (0, 0, 255),
+    }
+    # The window widens the lines as it zooms, a wider pen would only
+    # multiply the pixels written for every sample
+    MAX_PEN_WIDTH = 3
+
+    def __init__(self, width: int, height: int, bg: str = "white", canvas=None):
+        self.__width = width
+        self.__height = height
+        self.__bg = self.color_to_rgb(bg)
+        self.__framebuffer = np.empty((height, width, 3), dtype=np.uint8)
+        self.__framebuffer[:] = self.__bg
+
+        # With a Tk canvas the framebuffer is blitted to a PhotoImage at the
+        # end of every frame, without one the backend is fully headless
+        self.__canvas = canvas
+        self.__photo = None
+        self.__image_item = None
+        self.__colors = {}
+
+    def begin_frame(self) -> None:
+        # Immediate mode: the whole frame is rasterized again
+        self.__framebuffer[:] = self.__bg
+
+    def end_frame(self) -> None:
+        if self.__canvas is None:
+            return
+        if self.__photo is None:
+            import tkinter as tk
+            self.__photo = tk.PhotoImage(master=self.__canvas,
+                                         width=self.__width, height=self.__height)
+            self.__image_item = self.__canvas.create_image(0, 0, image=self.__photo,
+                                                           anchor=tk.NW)
+        self.__photo.configure(data=self.to_ppm(), format="PPM")
+        self.__canvas.tag_lower(self.__image_item)
+
+    def clear(self) -> None:
+        self.__framebuffer[:] = self.__bg
+        if self.__image_item is not None:
+            self.__canvas.delete(self.__image_item)
+        self.__photo = None
+        self.__image_item = None
+
+    def color_to_rgb(self, color: str) -> tuple[int, int, int]:
+        if color in self.NAMED_COLORS:
+            return self.NAMED_COLORS[color]
+        hex_color = color.lstrip("#")
+        if len(hex_color) == 3:
+            hex_color = "".join(c * 2 for c in hex_color)
+        try:
+            return tuple(int(hex_color[i : i + 2], 16) for i in (0, 2, 4))
+        except ValueError:
+            print("Invalid color", color, ", drawn in black")
+            return (0, 0, 0)
+
+    def __rgb(self, color: str) -> np.ndarray:
+        if color not in self.__colors:
+            self.__colors[color] = np.array(self.color_to_rgb(color), dtype=np.uint8)
+        return self.__colors[color]
+
+    def __plot(self, x: np.ndarray, y: np.ndarray, color: str) -> None:
+        inside = (x >= 0) & (x < self.__width) & (y >= 0) & (y < self.__height)
+        self.__framebuffer[y[inside], x[inside]] = self.__rgb(color)
+
+    def __clip_to_buffer(self, segments: np.ndarray) -> np.ndarray:
+        # Liang-Barsky against the framebuffer, so the number of samples of
+        # each segment is bounded by the size of the image
+        p1 = segments[:, 0]
+        delta = segments[:, 1] - p1
+        p = np.concatenate([-delta, delta], axis=1)
+        q = np.concatenate([p1, [self.__width - 1, self.__height - 1] - p1], axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            u = q / p
+        u1 = np.max(np.where(p < 0, u, 0), axis=1, initial=0)
+        u2 = np.min(np.where(p > 0, u, 1), axis=1, initial=1)
+        keep = ~np.any((p == 0) & (q < 0), axis=1) & (u1 <= u2)
+        return np.stack([p1 + u1[:, None] * delta, p1 + u2[:, None] * delta],
+                        axis=1)[keep]
+
+    def __stamp(self, width: float) -> np.ndarray:
+        # Pixel offsets of a square pen of the given width
+        w = min(max(1, int(round(width))), self.MAX_PEN_WIDTH)
+        offsets = np.arange(-((w - 1) // 2), w // 2 + 1)
+        return np.stack(np.meshgrid(offsets, offsets), axis=-1).reshape(-1, 2)
+
+    def draw_segments(self, segments: np.ndarray, color: str, width: float) -> None:
+        # Vectorized DDA: every segment is sampled once per pixel of its
+        # major axis, all segments at the same time
+        segments = np.asarray(segments, dtype=float).reshape(-1, 2, 2)
+        segments = self.__clip_to_buffer(segments)
+        if not len(segments):
+            return
+        p0 = segments[:, 0]
+        delta = segments[:, 1] - p0
+        steps = np.ceil(np.abs(delta).max(axis=1)).astype(np.int64) + 1
+
+        segment_index = np.repeat(np.arange(len(segments)), steps)
+        starts = np.cumsum(steps) - steps
+        sample = np.arange(steps.sum()) - np.repeat(starts, steps)
+        t = sample / np.maximum(steps - 1, 1)[segment_index]
+        pixels = np.rint(p0[segment_index] + t[:, None] * delta[segment_index]).astype(np.int64)
+
+        stamp = self.__stamp(width)
+        if len(stamp) > 1:
+            pixels = (pixels[:, None, :] + stamp[None, :, :]).reshape(-1, 2)
+        self.__plot(pixels[:, 0], pixels[:, 1], color)
+
+    def draw_polyline(self, points: np.ndarray, color: str, width: float) -> None:
+        points = np.asarray(points, dtype=float)
+        if len(points) < 2:
+            return
+        self.draw_segments(np.stack([points[:-1], points[1:]], axis=1), color, width)
+
+    def draw_polygon(self, points: np.ndarray, color: str, width: float) -> None:
+        # Scanline fill (even-odd rule), sampled at the pixel centers
+        points = np.asarray(points, dtype=float)
+        if len(points) < 3:
+            return
+        x0, y0 = points[:, 0], points[:, 1]
+        x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+
+        row_min = max(int(np.floor(y0.min())), 0)
+        row_max = min(int(np.ceil(y0.max())), self.__height - 1)
+        if row_min <= row_max:
+            rows = np.arange(row_min, row_max + 1)[:, None] + 0.5
+            crosses = (y0 <= rows) != (y1 <= rows)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                xs = x0 + (rows - y0) * (x1 - x0) / (y1 - y0)
+            xs = np.sort(np.where(crosses, xs, np.inf), axis=1)
+
+            # Consecutive intersections delimit the spans inside the polygon
+            left, right = xs[:, 0::2], xs[:, 1::2]
+            n_pairs = min(left.shape[1], right.shape[1])
+            left, right = left[:, :n_pairs], right[:, :n_pairs]
+            valid = np.isfinite(left) & np.isfinite(right)
+            span_rows = np.broadcast_to(rows - 0.5, left.shape)[valid].astype(np.int64)
+            span_start = np.clip(np.ceil(left[valid] - 0.5), 0, self.__width).astype(np.int64)
+            span_end = np.clip(np.floor(right[valid] - 0.5), -1, self.__width - 1).astype(np.int64)
+            lengths = np.maximum(span_end - span_start + 1, 0)
+
+            starts = np.cumsum(lengths) - lengths
+            x = (np.arange(lengths.sum()) - np.repeat(starts, lengths)
+                 + np.repeat(span_start, lengths))
+            self.__plot(x, np.repeat(span_rows, lengths), color)
+
+        self.draw_polyline(np.vstack([points, points[:1]]), color, width)
+
+    def draw_oval(self, x0: float, y0: float, x1: float, y1: float, color: str) -> None:
+        cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+        rx, ry = max((x1 - x0) / 2, 0.5), max((y1 - y0) / 2, 0.5)
+        # Only the part of the box that is in the buffer
+        xs = np.arange(max(int(np.floor(x0)), 0), min(int(np.ceil(x1)), self.__width - 1) + 1)
+        ys = np.arange(max(int(np.floor(y0)), 0), min(int(np.ceil(y1)), self.__height - 1) + 1)
+        x, y = np.meshgrid(xs, ys)
+        inside = ((x - cx) / rx) ** 2 + ((y - cy) / ry) ** 2 <= 1
+        self.__plot(x[inside], y[inside], color)
+
+    def draw_frame(self, x0: float, y0: float, x1: float, y1: float, color: str) -> None:
+        corners = np.array([(x0, y0), (x1, y0), (x1, y1), (x0, y1), (x0, y0)], dtype=float)
+        self.draw_polyline(corners, color, 1)
+
+    @property
+    def framebuffer(self) -> np.ndarray:
+        return self.__framebuffer
+
+    def to_ppm(self) -> bytes:
+        header = f"P6 {self.__width} {self.__height} 255\n".encode()
+        return header + self.__framebuffer.tobytes()
+
+    def to_png(self) -> bytes:
+        def chunk(kind: bytes, data: bytes) -> bytes:
+            return (struct.pack(">I", len(data)) + kind + data
+                    + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF))
+
+        # Every scanline starts with the filter type (0 = none)
+        raw = np.zeros((self.__height, 1 + 3 * self.__width), dtype=np.uint8)
+        raw[:, 1:] = self.__framebuffer.reshape(self.__height, -1)
+        header = struct.pack(">IIBBBBB", self.__width, self.__height, 8, 2, 0, 0, 0)
+        return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+                + chunk(b"IDAT", zlib.compress(raw.tobytes(), 6))
+                + chunk(b"IEND", b""))
+
+    def save(self, file_name: str) -> None:
+        data = self.to_png() if file_name.lower().endswith(".png") else self.to_ppm()
+        with open(file_name, "wb") as f:
+            f.write(data)
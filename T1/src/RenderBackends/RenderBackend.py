@@ -0,0 +1,45 @@
+import numpy as np
+from abc import ABC, abstractmethod
+
+
+class RenderBackend(ABC):
+    # Everything a backend receives is already in viewport (pixel) coordinates
+
+    def begin_frame(self) -> None:
+        pass
+
+    def set_owner(self, owner) -> None:
+        pass
+
+    def end_frame(self) -> None:
+        pass
+
+    def forget(self, owner) -> None:
+        pass
+
+    def save(self, file_name: str) -> None:
+        print(f"{self.__class__.__name__} can't save the frame to a file")
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+    @abstractmethod
+    def draw_oval(self, x0: float, y0: float, x1: float, y1: float, color: str) -> None:
+        pass
+
+    @abstractmethod
+    def draw_polyline(self, points: np.ndarray, color: str, width: float) -> None:
+        pass
+
+    @abstractmethod
+    def draw_segments(self, segments: np.ndarray, color: str, width: float) -> None:
+        pass
+
+    @abstractmethod
+    def draw_polygon(self, points: np.ndarray, color: str, width: float) -> None:
+        pass
+
+    @abstractmethod
+    def draw_frame(self, x0: float, y0: float, x1: float, y1: float, color: str) -> None:
+        pass
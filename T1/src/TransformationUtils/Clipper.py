@@ -1,3 +1,6 @@
+import numpy as np
+
+
 class Clipper:
     def __init__(self, world_limits_type:str="SCN",
                  algorithm_line:str="L-B",
@@ -19,327 +22,234 @@ class Clipper:
         return coords if c_x and c_y else None
 
 
-    def clip_line(self, coords: list[tuple[float]]) -> list[tuple[float]]:
+    def inside_mask(self, points: np.ndarray) -> np.ndarray:
+        # Same test as clip_point, for an (N, 2) array of points
+        x, y = points[:, 0], points[:, 1]
+        return ((self.__Xw_min <= x) & (x <= self.__Xw_max)
+                & (self.__Yw_min <= y) & (y <= self.__Yw_max))
+
+
+    def bbox_inside(self, bbox: tuple[float]) -> bool:
+        # bbox: (x_min, y_min, x_max, y_max), nothing of it needs clipping
+        x_min, y_min, x_max, y_max = bbox
+        return (self.__Xw_min <= x_min and x_max <= self.__Xw_max
+                and self.__Yw_min <= y_min and y_max <= self.__Yw_max)
+
+
+    def bbox_outside(self, bbox: tuple[float]) -> bool:
+        # Nothing of it can be visible
+        x_min, y_min, x_max, y_max = bbox
+        return (x_max < self.__Xw_min or x_min > self.__Xw_max
+                or y_max < self.__Yw_min or y_min > self.__Yw_max)
+
+
+    def bboxes_inside(self, bboxes: np.ndarray) -> np.ndarray:
+        # Same as bbox_inside, for an (N, 4) array of boxes
+        return ((self.__Xw_min <= bboxes[:, 0]) & (bboxes[:, 2] <= self.__Xw_max)
+                & (self.__Yw_min <= bboxes[:, 1]) & (bboxes[:, 3] <= self.__Yw_max))
+
+
+    def bboxes_outside(self, bboxes: np.ndarray) -> np.ndarray:
+        # Same as bbox_outside, for an (N, 4) array of boxes
+        return ((bboxes[:, 2] < self.__Xw_min) | (bboxes[:, 0] > self.__Xw_max)
+                | (bboxes[:, 3] < self.__Yw_min) | (bboxes[:, 1] > self.__Yw_max))
+
+
+    def clip_segments(self, segments: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # segments: (M, 2, 2) array, returns the clipped segments and a keep mask
+        segments = np.asarray(segments, dtype=float).reshape(-1, 2, 2)
+        # Trivial accept/reject with the outcodes, only the segments
+        # crossing a window edge go through the clipping algorithm
+        codes = self.__outcodes(segments)
+        keep = (codes[:, 0] | codes[:, 1]) == 0
+        crossing = ~keep & ((codes[:, 0] & codes[:, 1]) == 0)
+        clipped = segments.copy()
+        if crossing.any():
+            clipped[crossing], keep[crossing] = self.__clip_segments_kernel(segments[crossing])
+        return clipped, keep
+
+
+    def __clip_segments_kernel(self, segments: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
         if self.__clipping_algorithm_line == "L-B":
-            return self.liang_barsky(coords)
-        elif self.__clipping_algorithm_line == "C-S":
-            return self.cohen_sutherland(coords)
-        elif self.__clipping_algorithm_line == "N-L-N":
-            return self.nicholl_lee_nicholl(coords)
+            return self.liang_barsky_batch(segments)
+        # N-L-N is clipped as the iterative outcode algorithm, both are done
+        # by the same kernel
+        elif self.__clipping_algorithm_line in ["C-S", "N-L-N"]:
+            return self.cohen_sutherland_batch(segments)
         else:
             print("Invalid clipping algorithm")
-            return []
+            return segments, np.zeros(len(segments), dtype=bool)
 
 
-    def clip_polygon(self, coords: list[tuple[float]],
-                     edges:list[tuple[int]]) -> tuple[list[tuple[float]]]:
+    def clip_polygon(self, coords: np.ndarray,
+                     rings: list[list[int]]) -> list[np.ndarray]:
+        # rings: ordered vertex indices of each polygon (e.g. each face),
+        # returns the clipped rings as (K, 2) arrays
         if self.__clipping_algorithm_polygon == "S-H":
-            return self.sutherland_hodgman(coords, edges)
+            return self.sutherland_hodgman(coords, rings)
 
         print("Invalid clipping algorithm")
-        return [], []
-
-    def clip_curve(self, coords: list[tuple[float]]) -> list[tuple[float]]:
-        # Clipped coords is a list of lists, where each nested list represents a piece of the curve
-        clipped_coords = []
-        new_curve = True
-
-        for j in range(len(coords) - 1):
-            clipped_line = self.clip_line([coords[j], coords[j + 1]])
-
-            # If the clipped line is empty, start a new piece of the curve
-            if not clipped_line:
-                new_curve = True
-                continue
-
-            if new_curve:
-                clipped_coords.append([])
-                new_curve = False
-            
-            # Add the clipped points to the last curve created
-            clipped_coords[-1].extend(clipped_line)
-
-        return clipped_coords
-
-
-    # Função para verificar se um ponto 'p' está dentro de uma aresta 'edge'
-    def __inside(self, p, edge):
-        # Usa o produto vetorial para determinar se o ponto está à esquerda
-        # da aresta quando esta é percorrida no sentido anti-horário.
-        edge_0, edge_1 = edge
-        x0, y0 = edge_0
-        x1, y1 = edge_1
-        x, y = p
-        '''
-        O produto vetorial entre dois vetores 2D,
-        (a, b) e (c, d) é dado pela fórmula: a * d - b * c.
-        Se o resultado do produto vetorial for positivo,
-        - significa que o vetor (c, d) está à esquerda do vetor (a, b).
-        Se o resultado for negativo,
-        - significa que o vetor (c, d) está à direita do vetor (a, b).
-        Se o resultado for zero,
-        - significa que os vetores são colineares.
-        '''
-        return (x1 - x0) * (y - y0) > (y1 - y0) * (x - x0)
-
-
-    def __project_to_window_edge(self, point, edge):
-        x1, y1 = point
-        ex1, ey1 = edge[0]
-        ex2, ey2 = edge[1]
-
-        ex1, ex2 = min(edge[0][0], edge[1][0]), max(edge[0][0], edge[1][0])
-        ey1, ey2 = min(edge[0][1], edge[1][1]), max(edge[0][1], edge[1][1])
-
-        y_proj = min(max(y1, ey1), ey2)
-        x_proj = min(max(x1, ex1), ex2)
-        return x_proj, y_proj
-
-
-
-    # Função para calcular a interseção de uma aresta 'edge' com a linha formada por 'p1' e 'p2'
-    def __compute_intersection(self, p1, p2, edge):
-        # Usando o método de determinantes para encontrar o ponto de interseção
-        x1, y1 = p1
-        x2, y2 = p2
-        x3, y3 = edge[0]
-        x4, y4 = edge[1]
-
-
-        dx_p = x1 - x2
-        dy_p = y1 - y2
-        dx_e = x3 - x4
-        dy_e = y3 - y4
-
-        den = dx_p * dy_e - dy_p * dx_e
-        # Se o determinante for zero, significa que as linhas são paralelas ou coincidentes.
-        if den == 0:
-            return None
-        """
-        Fórmula da Interseção:
-            Se as linhas não forem paralelas, é possível calcular o ponto de interseção.
-            A fórmula para calcular o ponto de interseção é derivada de um sistema de equações lineares.
-            O ponto de interseção é calculado usando a fórmula:
-                x = x1 + t * (x2 - x1),
-                y = y1 + t * (y2 - y1),
-            onde 't' é um parâmetro que determina a posição
-            do ponto de interseção ao longo da linha formada
-            por 'p1' e 'p2'.
-        """
-        t = ((x1 - x3) * dy_e - (y1 - y3) * dx_e) / den
-        x = x1 - dx_p * t
-        y = y1 - dy_p * t
-        return x, y
-
-
-    def sutherland_hodgman(self, polygon: list[tuple[float]],
-                           edges:list[tuple[int]]) -> tuple[list[tuple[float]]]:
-        # Cria uma cópia do polígono e das arestas originais para modificar
-        clipped_polygon = polygon[:]
-        clipped_edges = edges[:]
-
-        window_points = [
-                    (self.__Xw_min, self.__Yw_min),
-                    (self.__Xw_max, self.__Yw_min),
-                    (self.__Xw_max, self.__Yw_max),
-                    (self.__Xw_min, self.__Yw_max)
-                  ]
-        # divide a window em arestas
-        window = [(window_points[i], window_points[(i + 1) % 4]) for i in range(4)]
-
-        for edge in window:
-            new_polygon = []
-            new_edges = []
-            if not clipped_polygon:
-                break
+        return []
+
+    def clip_polylines(self, lines: list[np.ndarray]) -> list[np.ndarray]:
+        # Every segment of the (N, 2) polylines is clipped with a single
+        # call of the clipping kernel. They are put one after the other, and
+        # the segment from the end of one to the start of the next is
+        # discarded. A piece only ends at a segment that is fully outside,
+        # and the points repeated between consecutive segments are dropped,
+        # so each piece is an (K, 2) array to draw as is
+        lines = [line for line in (np.asarray(line, dtype=float).reshape(-1, 2)
+                                   for line in lines) if len(line) > 1]
+        if not lines:
+            return []
+        points = np.concatenate(lines)
+        clipped, keep = self.clip_segments(np.stack([points[:-1], points[1:]], axis=1))
+        keep[np.cumsum([len(line) for line in lines[:-1]], dtype=np.int64) - 1] = False
+        if not keep.any():
+            return []
 
-            for p_edge in clipped_edges:
-                prev_point = clipped_polygon[p_edge[0]]
-                point = clipped_polygon[p_edge[1]]
-                if self.__inside(point, edge):
-                    if not self.__inside(prev_point, edge):
-                        prev_point = self.__compute_intersection(prev_point, point, edge)
-                    if prev_point:
-                        new_polygon.append(prev_point)
-                        new_polygon.append(point)
-                        L = len(new_polygon)
-                        new_edges.append((L - 2, L - 1))
-                    else:
-                        print("Error: intersection not found", prev_point, point)
-                elif self.__inside(prev_point, edge):
-                    point = self.__compute_intersection(prev_point, point, edge)
-                    if point:
-                        new_polygon.append(prev_point)
-                        new_polygon.append(point)
-                        L = len(new_polygon)
-                        new_edges.append((L - 2, L - 1))
-                    else:
-                        print("Error: intersection not found", prev_point, point)
-                else:
-                    prev_point = self.__project_to_window_edge(prev_point, edge)
-                    point = self.__project_to_window_edge(point, edge)
-                    new_polygon.append(prev_point)
-                    new_polygon.append(point)
-                    L = len(new_polygon)
-                    new_edges.append((L - 2, L - 1))
-
-            clipped_polygon = new_polygon
-            clipped_edges = new_edges
-        x_ses = [x for x, _ in clipped_polygon]
-        y_ses = [y for _, y in clipped_polygon]
-        c_x = min(x_ses) >= self.__Xw_max or max(x_ses) <= self.__Xw_min
-        c_y = min(y_ses) >= self.__Yw_max or max(y_ses) <= self.__Yw_min
-        if c_x or c_y:
-            return [], []
-        return clipped_polygon, clipped_edges
-
-    def liang_barsky(self, coords: list[tuple[float]]) -> list[tuple[float]]:
-        clipped_coords = []
-        p1, p2 = coords
-        dx = p2[0] - p1[0]
-        dy = p2[1] - p1[1]
-        p = [-dx, dx, -dy, dy]
-        q = [
-             p1[0] - self.__Xw_min,
-             self.__Xw_max - p1[0],
-             p1[1] - self.__Yw_min,
-             self.__Yw_max - p1[1]
-            ]
-        u1 = 0
-        u2 = 1
-        for i in range(4):
-            if p[i] == 0:
-                if q[i] < 0:
-                    return []
-            else:
-                u = q[i] / p[i]
-                if p[i] < 0:
-                    u1 = max(u1, u)
-                else:
-                    u2 = min(u2, u)
-        if u1 < u2:
-            clipped_coords = [
-                              (p1[0] + u1 * dx, p1[1] + u1 * dy),
-                              (p1[0] + u2 * dx, p1[1] + u2 * dy)
-                             ]
-        return clipped_coords
-    
+        clipped = clipped.reshape(-1, 2)
+        used = np.repeat(keep, 2)
+        repeated = np.zeros(len(clipped), dtype=bool)
+        repeated[1:] = np.all(clipped[1:] == clipped[:-1], axis=1) & used[:-1]
+        used &= ~repeated
+
+        # A piece starts at every kept segment that follows a discarded one
+        starts = keep.copy()
+        starts[1:] &= ~keep[:-1]
+        positions = np.cumsum(used)[2 * np.flatnonzero(starts)] - 1
+        return np.split(clipped[used], positions[1:])
 
-    def __compute_outcode(self, x: float, y: float) -> int:
-        code = 0
-        if x < self.__Xw_min:
-            code |= 1
-        elif x > self.__Xw_max:
-            code |= 2
-        if y < self.__Yw_min:
-            code |= 4
-        elif y > self.__Yw_max:
-            code |= 8
-        return code
 
+    def sutherland_hodgman(self, coords: np.ndarray,
+                           rings: list[list[int]]) -> list[np.ndarray]:
+        coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+        rings = [ring for ring in rings if len(ring)]
+        if not rings:
+            return []
 
-    def cohen_sutherland(self, coords: list[tuple[float]]) -> list[tuple[float]]:
-        p1, p2 = coords
+        # Aceitação/rejeição trivial de todos os anéis de uma vez
+        sizes = np.array([len(ring) for ring in rings])
+        starts = np.cumsum(sizes) - sizes
+        codes = self.__outcodes(coords)[np.concatenate(rings)]
+        codes_or = np.bitwise_or.reduceat(codes, starts)
+        codes_and = np.bitwise_and.reduceat(codes, starts)
+
+        clipped_rings = []
+        for ring, code_or, code_and in zip(rings, codes_or.tolist(), codes_and.tolist()):
+            if code_or == 0:
+                clipped_rings.append(coords[ring])
+            elif code_and == 0:
+                clipped = self.__clip_ring(coords[ring].tolist())
+                if len(clipped) >= 3:
+                    clipped_rings.append(np.array(clipped))
+        return clipped_rings
+
+
+    def __clip_ring(self, ring: list[list[float]]) -> list[tuple[float]]:
+        # Um passo por aresta da window: (eixo, limite, lado de dentro)
+        window = [(0, self.__Xw_min, 1), (0, self.__Xw_max, -1),
+                  (1, self.__Yw_min, 1), (1, self.__Yw_max, -1)]
+
+        for axis, limit, side in window:
+            if not ring:
+                break
+            new_ring = []
+            prev_point = ring[-1]
+            prev_inside = (prev_point[axis] - limit) * side >= 0
+            for point in ring:
+                inside = (point[axis] - limit) * side >= 0
+                # A aresta cruza a window: entra o ponto de interseção
+                if inside != prev_inside:
+                    t = (limit - prev_point[axis]) / (point[axis] - prev_point[axis])
+                    intersection = [prev_point[0] + t * (point[0] - prev_point[0]),
+                                    prev_point[1] + t * (point[1] - prev_point[1])]
+                    intersection[axis] = limit
+                    new_ring.append(intersection)
+                if inside:
+                    new_ring.append(point)
+                prev_point, prev_inside = point, inside
+            ring = new_ring
+
+        # Os vértices repetidos (pontos sobre a borda da window) são removidos
+        compact = [tuple(point) for i, point in enumerate(ring) if point != ring[i - 1]]
+        return compact if len(compact) > 1 else []
+
+    def liang_barsky_batch(self, segments: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        segments = np.asarray(segments, dtype=float).reshape(-1, 2, 2)
+        p1 = segments[:, 0]
+        delta = segments[:, 1] - p1
+        dx, dy = delta[:, 0], delta[:, 1]
+
+        p = np.stack([-dx, dx, -dy, dy], axis=1)
+        q = np.stack([p1[:, 0] - self.__Xw_min,
+                      self.__Xw_max - p1[:, 0],
+                      p1[:, 1] - self.__Yw_min,
+                      self.__Yw_max - p1[:, 1]], axis=1)
+
+        parallel = p == 0
+        rejected = np.any(parallel & (q < 0), axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            u = q / p
+        u1 = np.max(np.where(p < 0, u, 0), axis=1, initial=0)
+        u2 = np.min(np.where(p > 0, u, 1), axis=1, initial=1)
+
+        keep = ~rejected & (u1 < u2)
+        # Endpoints that are not clipped are kept exact, so consecutive
+        # segments still share them
+        clipped = np.stack([p1 + u1[:, None] * delta,
+                            np.where(u2[:, None] == 1, segments[:, 1],
+                                     p1 + u2[:, None] * delta)], axis=1)
+        return clipped, keep
+
+
+    def __outcodes(self, points: np.ndarray) -> np.ndarray:
+        # Region codes of an (..., 2) array of points: 1 left, 2 right,
+        # 4 bottom and 8 top of the window
+        x, y = points[..., 0], points[..., 1]
+        return ((x < self.__Xw_min) * 1 | (x > self.__Xw_max) * 2
+                | (y < self.__Yw_min) * 4 | (y > self.__Yw_max) * 8)
+
+
+    def cohen_sutherland_batch(self, segments: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # Each iteration moves one outside endpoint of every undecided
+        # segment to the window edge given by its outcode, until the
+        # segment is trivially accepted or rejected
+        clipped = np.array(segments, dtype=float).reshape(-1, 2, 2)
+        codes = self.__outcodes(clipped)
+        keep = np.zeros(len(clipped), dtype=bool)
+        active = np.ones(len(clipped), dtype=bool)
+
+        # Each endpoint is moved at most twice (to one x and one y edge), so
+        # 4 moves and a last test are enough, the spare ones absorb rounding
+        for _ in range(8):
+            keep |= active & ((codes[:, 0] | codes[:, 1]) == 0)
+            active &= ~keep & ((codes[:, 0] & codes[:, 1]) == 0)
+            rows = np.flatnonzero(active)
+            if not len(rows):
+                break
 
-        if p1[0] > p2[0]:
-            p1, p2 = p2, p1
+            end = (codes[rows, 0] == 0).astype(np.int64)
+            code_out = codes[rows, end]
+            p1, p2 = clipped[rows, 0], clipped[rows, 1]
+            dx, dy = p2[:, 0] - p1[:, 0], p2[:, 1] - p1[:, 1]
 
-        RC1 = self.__compute_outcode(*p1)
-        RC2 = self.__compute_outcode(*p2)
+            vertical_edge = (code_out & 3) != 0
+            x = np.where(code_out & 1, self.__Xw_min, self.__Xw_max).astype(float)
+            y = np.where(code_out & 4, self.__Yw_min, self.__Yw_max).astype(float)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                y = np.where(vertical_edge, p1[:, 1] + dy * (x - p1[:, 0]) / dx, y)
+                x = np.where(vertical_edge, x, p1[:, 0] + dx * (y - p1[:, 1]) / dy)
 
-        RC0 = RC1 | RC2
-        if RC0 == 0:
-            return coords
+            clipped[rows, end, 0] = x
+            clipped[rows, end, 1] = y
+            codes[rows, end] = self.__outcodes(clipped[rows, end])
 
-        RC = RC1 & RC2
-        if RC != 0:
-            return []
+        # The last moves are tested too, whatever is still undecided after
+        # them is rejected instead of returned half clipped
+        keep |= active & ((codes[:, 0] | codes[:, 1]) == 0)
+        return clipped, keep
 
-        clipped_coords = [p1, p2]
-        dx = p2[0] - p1[0]
-        dy = p2[1] - p1[1]
-        if dx == dy == 0:
-            return self.clip_point(p1)
-        elif dx == 0:
-            x = p1[0]
-            y1 = max((min(p1[1], self.__Yw_max)), self.__Yw_min)
-            y2 = max((min(p2[1], self.__Yw_max)), self.__Yw_min)
-            return [(x, y1), (x, y2)]
-        elif dy == 0:
-            y = p1[1]
-            x1 = max((min(p1[0], self.__Xw_max)), self.__Xw_min)
-            x2 = max((min(p2[0], self.__Xw_max)), self.__Xw_min)
-            return [(x1, y), (x2, y)]
-        m = dy / dx
-        yE = m * (self.__Xw_min - p1[0]) + p1[1]
-        yD = m * (self.__Xw_max - p1[0]) + p1[1]
-        xT = (self.__Yw_max - p1[1]) / m + p1[0]
-        xF = (self.__Yw_min - p1[1]) / m + p1[0]
-        pX_min = pX_max = pY_min = pY_max = None
-        if (RC0 & 1) and (self.__Yw_min <= yE <= self.__Yw_max):
-            pX_min = (self.__Xw_min, yE)
-            clipped_coords[0] = pX_min
-        elif (RC0 & 2) and (self.__Yw_min <= yD <= self.__Yw_max):
-            pX_max = (self.__Xw_max, yD)
-            clipped_coords[1] = pX_max
-        if (RC0 & 4) and (self.__Xw_min <= xF <= self.__Xw_max):
-            pY_min = (xF, self.__Yw_min)
-            if xT > xF:
-                clipped_coords[0] = pY_min
-            else:
-                clipped_coords[1] = pY_min
-        elif (RC0 & 8) and (self.__Xw_min <= xT <= self.__Xw_max):
-            pY_max = (xT, self.__Yw_max)
-            if xT > xF:
-                clipped_coords[1] = pY_max
-            else:
-                clipped_coords[0] = pY_max
-        if clipped_coords == [p1, p2]:
-            clipped_coords = []
-        clipped_coords = [tuple(float(i) for i in j) for j in clipped_coords]
-        return clipped_coords
-
-    def nicholl_lee_nicholl(self, line: list[tuple[float]]) -> list[tuple[float]]:
-        p1, p2 = line
-        outcode1 = self.__compute_outcode(*p1)
-        outcode2 = self.__compute_outcode(*p2)
-        accept = False
-
-        while True:
-            if not (outcode1 | outcode2):
-                accept = True
-                break
-            elif outcode1 & outcode2:
-                break
-            else:
-                x = None
-                y = None
-                outcode_out = outcode1 if outcode1 else outcode2
-
-                if outcode_out & 1:
-                    x = self.__Xw_min
-                    y = p1[1] + (p2[1] - p1[1]) * (x - p1[0]) / (p2[0] - p1[0])
-                elif outcode_out & 2:
-                    x = self.__Xw_max
-                    y = p1[1] + (p2[1] - p1[1]) * (x - p1[0]) / (p2[0] - p1[0])
-                elif outcode_out & 4:
-                    y = self.__Yw_min
-                    x = p1[0] + (p2[0] - p1[0]) * (y - p1[1]) / (p2[1] - p1[1])
-                elif outcode_out & 8:
-                    y = self.__Yw_max
-                    x = p1[0] + (p2[0] - p1[0]) * (y - p1[1]) / (p2[1] - p1[1])
-
-                if outcode_out == outcode1:
-                    p1 = (x, y)
-                    outcode1 = self.__compute_outcode(x, y)
-                else:
-                    p2 = (x, y)
-                    outcode2 = self.__compute_outcode(x, y)
-
-        if accept:
-            return [tuple(float(i) for i in j) for j in [p1, p2]]
-        else:
-            return []
 
     @property
     def Xw_min(self) -> int:
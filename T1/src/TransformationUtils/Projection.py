@@ -0,0 +1,117 @@
+import numpy as np
+
+
+def perspective(coords: np.ndarray, mper: np.ndarray) -> np.ndarray:
+    # coords: (N, 4) homogeneous world coordinates (one row per vertex).
+    # mper is applied as a column-vector matrix (mper @ v) for every vertex
+    return np.asarray(coords, dtype=float) @ mper.T
+
+
+def divide_and_normalize(projected: np.ndarray, d: float,
+                         normalize_matrix: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # projected: (N, 4) coordinates after mper. Returns the (N, 2) normalized
+    # coordinates and a (N,) mask telling which vertices are in front of the
+    # projection plane (z >= d). Invalid rows are left as zeros, it's up to
+    # the caller to discard them.
+    valid = projected[:, 2] >= d
+    w = projected[:, 3:]
+
+    # Perspective divide, done only where it is defined
+    plane_coords = np.ones((len(projected), 4))
+    plane_coords[:, 2] = d
+    np.divide(projected[:, :2], w, out=plane_coords[:, :2], where=valid[:, None])
+    plane_coords[~valid, :2] = 0
+
+    normalized = plane_coords @ normalize_matrix
+    return normalized[:, :2], valid
+
+
+# Near plane clipping: the coordinates after mper and before the divide are
+# cut at the projection plane z = d (w = 1), so what is left can always be
+# divided. New vertices are put exactly on the plane.
+
+def near_plane_intersection(a: np.ndarray, b: np.ndarray, d: float) -> np.ndarray:
+    # a, b: (..., 4) points on opposite sides of the plane
+    t = (d - a[..., 2:3]) / (b[..., 2:3] - a[..., 2:3])
+    point = a + t * (b - a)
+    point[..., 2] = d
+    return point
+
+
+def clip_segments_near(segments: np.ndarray, d: float) -> tuple[np.ndarray, np.ndarray]:
+    # segments: (M, 2, 4), returns the clipped segments and a keep mask
+    front = segments[:, :, 2] >= d
+    keep = front.any(axis=1)
+    crossing = np.flatnonzero(keep & ~front.all(axis=1))
+
+    clipped = segments.copy()
+    behind = (~front[crossing, 1]).astype(np.int64)
+    clipped[crossing, behind] = near_plane_intersection(segments[crossing, 0],
+                                                        segments[crossing, 1], d)
+    return clipped, keep
+
+
+def _front_counts(front: np.ndarray, groups: list[list[int]]) -> list[int]:
+    # Number of vertices in front of the plane in each ring or chain
+    if not groups:
+        return []
+    sizes = np.array([len(group) for group in groups])
+    starts = np.cumsum(sizes) - sizes
+    return np.add.reduceat(front[np.concatenate(groups)].astype(np.int64), starts).tolist()
+
+
+def clip_rings_near(projected: np.ndarray, rings: list[list[int]],
+                    chains: list[list[int]], d: float
+                    ) -> tuple[np.ndarray, list[list[int]], list[list[int]]]:
+    # Rings are clipped as polygons (one Sutherland-Hodgman pass against the
+    # plane), chains are split where they go behind it. The intersections
+    # are appended to the vertices and the indices of both are rewritten.
+    # Only the rings and chains that cross the plane are walked one by one.
+    rings = [ring for ring in rings if len(ring)]
+    chains = [chain for chain in chains if len(chain)]
+    front_mask = projected[:, 2] >= d
+    front = front_mask.tolist()
+    new_points = []
+
+    def intersection(a: int, b: int) -> int:
+        new_points.append(near_plane_intersection(projected[a], projected[b], d))
+        return len(projected) + len(new_points) - 1
+
+    new_rings = []
+    for ring, n_front in zip(rings, _front_counts(front_mask, rings)):
+        if n_front == len(ring):
+            new_rings.append(ring)
+            continue
+        if n_front == 0:
+            continue
+        new_ring = []
+        prev = ring[-1]
+        for i in ring:
+            if front[i] != front[prev]:
+                new_ring.append(intersection(prev, i))
+            if front[i]:
+                new_ring.append(i)
+            prev = i
+        new_rings.append(new_ring)
+
+    new_chains = []
+    for chain, n_front in zip(chains, _front_counts(front_mask, chains)):
+        if n_front == len(chain):
+            new_chains.append(chain)
+            continue
+        new_chain = []
+        for prev, i in zip([None] + chain[:-1], chain):
+            if prev is not None and front[i] != front[prev]:
+                new_chain.append(intersection(prev, i))
+            if front[i]:
+                new_chain.append(i)
+            elif new_chain:
+                if len(new_chain) > 1:
+                    new_chains.append(new_chain)
+                new_chain = []
+        if len(new_chain) > 1:
+            new_chains.append(new_chain)
+
+    if new_points:
+        projected = np.vstack([projected, new_points])
+    return projected, new_rings, new_chains
@@ -1,5 +1,7 @@
 import numpy as np
 from src.Objetos.Ponto3D import Ponto3D
+from src.TransformationUtils.Projection import (perspective, divide_and_normalize,
+                                                clip_segments_near, clip_rings_near)
 from math import sqrt
 
 class Transformator:
@@ -22,6 +24,8 @@ class Transformator:
         self.__scaling_factor = 1
 
         self._normal_matrix = None
+        # Incremented every time the normalization matrix changes
+        self.__version = 0
         self.obj = Ponto3D("generic_obj")
         # view up vector
         self.__viewup = np.array([0, 1, 0, 1])
@@ -40,6 +44,7 @@ class Transformator:
         R = self.__get_rotate_matrix(theta)
         S = self.__get_scale_matrix(sx, sy)
         self._normal_matrix = np.matmul(np.matmul(self.__get_parallel_projection_matrix(), R), S)
+        self.__version += 1
 
     def __get_parallel_projection_matrix(self) -> np.ndarray:
         dx = self.__cop[0]
@@ -62,6 +67,35 @@ class Transformator:
         # The multiplication by -1 is needed to make the rotation counter-clockwise.
         self.__viewup_angle = np.degrees(-1 * (np.pi / 2 - np.arctan2(self.__viewup[1], self.__viewup[0])))
 
+    # Projection: perspective(), then the near plane clipping of whatever
+    # crosses z = d, then normalize(). Any (N, 4) block of homogeneous
+    # coordinates at once, e.g. the vertices of the whole display file
+    def perspective(self, coords: np.ndarray) -> np.ndarray:
+        # mper only, before the divide
+        return perspective(coords, self.__mper)
+
+    def normalize(self, projected: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # Perspective divide and normalization
+        return divide_and_normalize(projected, self.__dop, self._normal_matrix)
+
+    def clip_segments_near(self, segments: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        return clip_segments_near(segments, self.__dop)
+
+    def clip_rings_near(self, projected: np.ndarray, rings: list[list[int]],
+                        chains: list[list[int]]) -> tuple[np.ndarray, list, list]:
+        return clip_rings_near(projected, rings, chains, self.__dop)
+
+    def view_footprint(self, x_min: float = -1, y_min: float = -1,
+                       x_max: float = 1, y_max: float = 1) -> tuple[float]:
+        # AABB on the projection plane of the region normalized to the given
+        # limits: the corners are scaled and unrotated back, then moved to the center
+        sx = 2 * self.__scaling_factor / (self.__xwmax - self.__xwmin)
+        sy = 2 * self.__scaling_factor / (self.__ywmax - self.__ywmin)
+        corners = np.array([self.unrotate_vector(x / sx, y / sy)[:2]
+                            for x in (x_min, x_max) for y in (y_min, y_max)])
+        corners += self.__cop[:2]
+        return (*corners.min(axis=0).tolist(), *corners.max(axis=0).tolist())
+
     def unrotate_vector(self, dx: float, dy: float, dz:float=0) -> tuple[float, float, float]:
         old_vector = np.array([dx, dy, dz, 1])
         rotate_matrix = self.__get_rotate_matrix(-self.__viewup_angle)
@@ -81,6 +115,14 @@ class Transformator:
     def matrix(self) -> np.array:
         return self._normal_matrix
 
+    @property
+    def version(self) -> int:
+        return self.__version
+
+    def pixel_scale(self, viewport_width: int) -> float:
+        # Pixels per unit of the projection plane
+        return self.__scaling_factor * viewport_width / (self.__xwmax - self.__xwmin)
+
     @property
     def dop(self) -> int:
         return self.__dop
@@ -1,28 +1,98 @@
-import tkinter as tk
+import numpy as np
+
+from src.RenderBackends.RenderBackend import RenderBackend
+from src.RenderBackends.RasterBackend import RasterBackend
+from src.RenderBackends.DisplayListBackend import DisplayListBackend
 
 
 class ViewPort:
-    def __init__(self, master=None, width_=600, height_=400, bg_="white"):
+    def __init__(self, master=None, width_=600, height_=400, bg_="white",
+                 backend: str = "canvas"):
         self.__border_size = 10
-
-        self.__canvas = tk.Canvas(master, width=width_ + 2 * self.__border_size, height=height_ + 2 * self.__border_size, bg=bg_)
-
-        self.__canvas.configure(scrollregion=self.__canvas.bbox("all"))
-
-        self.__canvas.pack()
+        self.__bg = bg_
 
         self.__width = width_
         self.__height = height_
-        
+
+        # Without a master the offscreen backends run with no display at all
+        self.__canvas = None
+        if master is not None or backend == "canvas":
+            # Tk only when there is something to show, so the offscreen
+            # backends also run on machines without it
+            import tkinter as tk
+            self.__canvas = tk.Canvas(master, width=width_ + 2 * self.__border_size, height=height_ + 2 * self.__border_size, bg=bg_)
+
+            self.__canvas.configure(scrollregion=self.__canvas.bbox("all"))
+
+            self.__canvas.pack()
+
+        self.__backend = None
+        self.set_backend(backend)
+
+
+    def set_backend(self, backend: str) -> None:
+        if self.__backend is not None:
+            self.__backend.clear()
+
+        if backend == "canvas":
+            from src.RenderBackends.CanvasBackend import CanvasBackend
+            self.__backend = CanvasBackend(self.__canvas)
+        elif backend == "raster":
+            self.__backend = RasterBackend(self.__width + 2 * self.__border_size,
+                                           self.__height + 2 * self.__border_size,
+                                           self.__bg, self.__canvas)
+        elif backend == "display_list":
+            self.__backend = DisplayListBackend(self.__width + 2 * self.__border_size,
+                                                self.__height + 2 * self.__border_size)
+        else:
+            print("Invalid render backend", backend)
+            return
         self.draw_outer_frame()
 
 
+    @property
+    def backend(self) -> RenderBackend:
+        return self.__backend
+
+
+    @property
+    def width(self) -> int:
+        return self.__width
+
+
+    @property
+    def height(self) -> int:
+        return self.__height
+
+
     def delete(self, object_name="all") -> None:
-        self.__canvas.delete(object_name)
+        if object_name == "all":
+            self.__backend.clear()
+        elif self.__canvas is not None:
+            self.__canvas.delete(object_name)
+
+
+    def begin_frame(self) -> None:
+        self.__backend.begin_frame()
+
+
+    def set_owner(self, owner) -> None:
+        # Every item drawn from now on belongs to this owner
+        self.__backend.set_owner(owner)
+
+
+    def forget(self, owner) -> None:
+        # The owner won't be drawn again
+        self.__backend.forget(owner)
+
+
+    def end_frame(self) -> None:
+        self.draw_outer_frame()
+        self.__backend.end_frame()
 
 
     def draw_outer_frame(self) -> None:
-        self.__canvas.create_rectangle(self.__border_size, self.__border_size, self.__width + self.__border_size, self.__height + self.__border_size, outline="red")
+        self.__backend.draw_frame(self.__border_size, self.__border_size, self.__width + self.__border_size, self.__height + self.__border_size, "red")
 
 
     def draw_oval(self, point:tuple[float], color: str, width) -> None:
@@ -32,36 +102,66 @@ class ViewPort:
         xc, yc = self.viewport_transform(x, y)
         x0, y0 = xc - width, yc - width
         x1, y1 = xc + width, yc + width
-        self.__canvas.create_oval(x0, y0, x1, y1, fill=color, outline=color)
+        self.__backend.draw_oval(x0, y0, x1, y1, color)
 
 
     def draw_line(self, points:list[tuple[float]], color: str, width: float) -> None:
         if points == []:
             return
-        p0, p1 = points
-        x0, y0 = self.viewport_transform(*p0)
-        x1, y1 = self.viewport_transform(*p1)
-        self.__canvas.create_line(x0, y0, x1, y1, fill=color, width=width)
+        self.__backend.draw_polyline(self.viewport_transform_array(points), color, width)
 
 
-    def draw_polygon(self, points: list[tuple[float]], edges: list[tuple[int]], color: str, width:float, fill=False) -> None:
-        if points == []:
+    def draw_polygon(self, rings: list[np.ndarray], color: str, width:float, fill=False) -> None:
+        # rings: ordered (K, 2) vertices of each polygon
+        if not rings:
             return
-        points = [self.viewport_transform(*point) for point in points]
         if fill:
-            self.__canvas.create_polygon(points, fill=color, outline=color, width=width)
+            for ring in rings:
+                self.__backend.draw_polygon(self.viewport_transform_array(ring), color, width)
             return
 
-        for start_p, end_p in edges:
-            self.__canvas.create_line(*points[start_p], *points[end_p], fill=color, width=width)
+        # The outlines of all the rings are welded together by the backend
+        segments = np.concatenate([np.stack([ring, np.roll(ring, -1, axis=0)], axis=1)
+                                   for ring in rings])
+        self.__backend.draw_segments(self.viewport_transform_array(segments), color, width)
 
 
     def draw_curve(self, sub_curves: list[tuple[float]],
                    color: str, width: float) -> None:
+        # Each clipped run of the curve is a single polyline
         for sub_curve in sub_curves:
-            for i in range(len(sub_curve) - 1):
-                line = [sub_curve[i], sub_curve[i + 1]]
-                self.draw_line(line, color, width)
+            if len(sub_curve) < 2:
+                continue
+            points = self.viewport_transform_array(sub_curve)
+            # The clipped runs repeat the point shared by consecutive segments
+            distinct = np.ones(len(points), dtype=bool)
+            distinct[1:] = np.any(points[1:] != points[:-1], axis=1)
+            points = points[distinct]
+            if len(points) > 1:
+                self.__backend.draw_polyline(points, color, width)
+
+
+    def draw_segments(self, segments: np.ndarray, color: str, width: float) -> None:
+        # segments: (M, 2, 2) normalized coordinates of loose segments
+        self.__backend.draw_segments(self.viewport_transform_array(segments), color, width)
+
+
+    def draw_points(self, points: np.ndarray, colors: list[str], width: float) -> None:
+        for (xc, yc), color in zip(self.viewport_transform_array(points).tolist(), colors):
+            self.__backend.draw_oval(xc - width, yc - width, xc + width, yc + width, color)
+
+
+    def save_image(self, file_name: str) -> None:
+        self.__backend.save(file_name)
+
+
+    def viewport_transform_array(self, points: np.ndarray) -> np.ndarray:
+        # Same as viewport_transform, for any array whose last axis is (x, y)
+        points = np.asarray(points, dtype=float)
+        transformed = np.empty_like(points)
+        transformed[..., 0] = (points[..., 0] + 1) / 2 * self.__width + self.__border_size
+        transformed[..., 1] = (1 - (points[..., 1] + 1) / 2) * self.__height + self.__border_size
+        return transformed
 
 
     def viewport_transform(self, x: float, y: float) -> list[float]:
@@ -1,23 +1,30 @@
-import tkinter as tk
+import numpy as np
 
 
 import src.ViewPort as VP
 from src.Objetos import Objeto3D as Obj3D
+from src.Objetos.Tessellation import request_tessellation, tessellate, tessellation_scheduler
 from src.TransformationUtils.Clipper import Clipper
 from src.TransformationUtils.Transformator import Transformator
+from src.WindowUtilis.SceneStore import SceneStore
 
 
 class Window:
-    def __init__(self, master=None, width_=600, height_=400):
-        self.__viewport_frame = tk.Frame(master)
-        self.__viewport_frame.pack(side=tk.RIGHT, fill=tk.BOTH, padx=(0, 80))
+    def __init__(self, master=None, width_=600, height_=400, backend: str = "canvas"):
+        # Without a master and with an offscreen backend the window is headless
+        self.__viewport_frame = None
+        if master is not None or backend == "canvas":
+            import tkinter as tk
+            self.__viewport_frame = tk.Frame(master)
+            self.__viewport_frame.pack(side=tk.RIGHT, fill=tk.BOTH, padx=(0, 80))
 
-        # Title: Viewport
-        tk.Label(
-            self.__viewport_frame, text="Viewport", font="System 12 bold", pady=5
-        ).pack()
+            # Title: Viewport
+            tk.Label(
+                self.__viewport_frame, text="Viewport", font="System 12 bold", pady=5
+            ).pack()
 
-        self.__viewport = VP.ViewPort(self.__viewport_frame, width_, height_)
+        self.__viewport = VP.ViewPort(self.__viewport_frame, width_, height_,
+                                      backend=backend)
         # using the normalized device coordinates
         self.__clipper = Clipper("SCN", "L-B")
         self.__transformator = Transformator("SCN", height_, width_)
@@ -25,56 +32,269 @@ class Window:
         self.__zoom_step = 0.1
         self.__width_drawings = 2
 
+        # Fixed: the density of each curve class. Adaptive: enough points
+        # for the chords to be within the tolerance (in pixels) of the curve
+        self.__adaptive_tessellation = False
+        self.__tessellation_tolerance = 0.5
+
+    @property
+    def projection_distance(self) -> float:
+        return self.__transformator.dop
+
+    def view_footprint(self) -> tuple[float]:
+        # What the clipping window sees, on the projection plane
+        return self.__transformator.view_footprint(self.__clipper.Xw_min, self.__clipper.Yw_min,
+                                                   self.__clipper.Xw_max, self.__clipper.Yw_max)
+
     def unrotate_vector(self, dx: float, dy: float, dz:float=0) -> tuple[float, float, float]:
         return self.__transformator.unrotate_vector(dx, dy, dz)
     
     def set_normalization_matrix(self, angle: float = 0):
         self.__transformator.set_normalization_matrix(angle)
     
-    def draw_object(self, object: Obj3D.Objeto3D):
-        obj_coords = object.calculate_perspective_normalized_coords(self.__transformator.dop, self.__transformator.perspective_matrix, self.__transformator.matrix)
+    def draw_objects(self, objects: list[Obj3D.Objeto3D]) -> None:
+        view_version = self.__transformator.version
+        visible = []
+        for obj in objects:
+            bbox = obj.get_normalized_bbox(view_version)
+            # Still out of the window since the last frame: not even projected,
+            # its items are only kept hidden
+            if bbox is not None and self.__clipper.bbox_outside(bbox):
+                self.__viewport.set_owner(id(obj))
+            else:
+                visible.append(obj)
+        if not visible:
+            return
+
+        # A single projection for every vertex of the display file
+        coords = np.concatenate([obj.homogeneous_coordinates for obj in visible])
+        projected = self.__transformator.perspective(coords)
+        normalized, valid = self.__transformator.normalize(projected)
+
+        limits = np.cumsum([len(obj) for obj in visible])[:-1]
+        for obj, obj_coords, obj_valid, obj_projected in zip(visible,
+                                                             np.split(normalized, limits),
+                                                             np.split(valid, limits),
+                                                             np.split(projected, limits)):
+            self.__draw_projected_object(obj, obj_coords, obj_valid, obj_projected)
+
+    def draw_scene(self, scene: SceneStore, rows: np.ndarray = None) -> None:
+        # Draws every packed object (or only the given rows of the store)
+        # with a few operations over the whole scene
+        self.__viewport.set_owner(scene)
+        if rows is None:
+            vertices, edges, edge_colors = scene.vertices, scene.edges, scene.edge_colors
+            point_indexes, point_colors = scene.points
+        else:
+            vertex_indexes, edges, edge_colors, point_indexes, point_colors = scene.select(rows)
+            vertices = scene.vertices[vertex_indexes]
+        if not len(vertices):
+            return
+        projected = self.__transformator.perspective(vertices)
+        normalized, valid = self.__transformator.normalize(projected)
+
+        inside = valid[point_indexes] & self.__clipper.inside_mask(normalized[point_indexes])
+        self.__viewport.draw_points(normalized[point_indexes[inside]],
+                                    [scene.palette[c] for c in point_colors[inside]],
+                                    self.__width_drawings)
 
-        if not obj_coords:
+        edge_valid = valid[edges]
+        in_front = edge_valid.all(axis=1)
+        segments = normalized[edges[in_front]]
+        colors = edge_colors[in_front]
+
+        # Edges crossing the projection plane are cut there before the divide
+        crossing = edge_valid.any(axis=1) & ~in_front
+        if crossing.any():
+            near_segments, _ = self.__transformator.clip_segments_near(projected[edges[crossing]])
+            near_segments, _ = self.__transformator.normalize(near_segments.reshape(-1, 4))
+            segments = np.concatenate([segments, near_segments.reshape(-1, 2, 2)])
+            colors = np.concatenate([colors, edge_colors[crossing]])
+
+        # Packed wireframes are never filled, their faces are clipped as
+        # separate edges and not as rings (see SceneStore.accepts)
+        segments, keep = self.__clipper.clip_segments(segments)
+        segments, colors = segments[keep], colors[keep]
+        for color in np.unique(colors):
+            self.__viewport.draw_segments(segments[colors == color],
+                                          scene.palette[color],
+                                          self.__width_drawings)
+
+    def __draw_projected_object(self, object: Obj3D.Objeto3D,
+                                obj_coords: np.ndarray, valid: np.ndarray,
+                                projected: np.ndarray) -> None:
+        self.__viewport.set_owner(id(object))
+        bbox = object.get_normalized_bbox(self.__transformator.version)
+        if bbox is None:
+            bbox = self.__normalized_bbox(object, obj_coords, valid)
+            object.set_normalized_bbox(self.__transformator.version, bbox)
+        # Trivial reject of the whole object, and trivial accept: nothing
+        # of an object fully inside the window goes through the clipper
+        if self.__clipper.bbox_outside(bbox):
             return
+        clip = not self.__clipper.bbox_inside(bbox)
+
+        # The edges crossing the projection plane are cut there, only
+        # what is in front of it is drawn
+        all_valid = valid.all()
 
         if object.obj_type == Obj3D.ObjectType.POINT:
-            self.draw_point(obj_coords[0], object.color)
+            self.draw_point(obj_coords[0].tolist(), object.color)
         elif object.obj_type == Obj3D.ObjectType.LINE:
-            self.draw_line(obj_coords, object.color)
+            if not all_valid:
+                segments, _ = self.__transformator.clip_segments_near(projected[None])
+                obj_coords, _ = self.__transformator.normalize(segments[0])
+            self.draw_line(obj_coords.tolist(), object.color, clip)
         elif object.obj_type == Obj3D.ObjectType.WIREFRAME:
-            self.draw_wireframe(obj_coords, object.edges, object.color, object.fill)
-        elif object.obj_type in [Obj3D.ObjectType.BEZIER_CURVE, Obj3D.ObjectType.BSPLINE_CURVE]:
-            self.draw_curve(object.generate_curve(obj_coords), object.color)
-        elif object.obj_type in [Obj3D.ObjectType.BEZIER_SURFACE, Obj3D.ObjectType.BSPLINE_SURFACE]:
-            self.draw_surface(object.generate_curves(obj_coords), object.color)
+            rings, chains = object.rings
+            if not all_valid:
+                projected, rings, chains = self.__transformator.clip_rings_near(projected, rings, chains)
+                obj_coords, _ = self.__transformator.normalize(projected)
+            self.draw_wireframe(obj_coords, rings, chains, object.color, object.fill, clip)
+        elif object.obj_type in [Obj3D.ObjectType.BEZIER_CURVE, Obj3D.ObjectType.BSPLINE_CURVE,
+                                 Obj3D.ObjectType.BEZIER_SURFACE, Obj3D.ObjectType.BSPLINE_SURFACE]:
+            density = None
+            if self.__adaptive_tessellation:
+                density = self.__adaptive_density(object, projected)
+            self.draw_tessellated(object, obj_coords, valid, clip, density)
+
+    def __adaptive_density(self, object: Obj3D.Objeto3D, projected: np.ndarray) -> int:
+        # The pixel tolerance in object space. The nearest control point
+        # gives the largest scale, and the model matrix can stretch the
+        # object by up to its largest singular value
+        d = self.__transformator.dop
+        z_near = max(projected[:, 2].min(), d)
+        pixels_per_unit = self.__transformator.pixel_scale(self.__viewport.width) * d / z_near
+        model_scale = np.linalg.norm(object.model_matrix[:3, :3], 2)
+        if model_scale == 0:
+            return object.density_for_tolerance(np.inf)
+        return object.density_for_tolerance(self.__tessellation_tolerance
+                                            / (pixels_per_unit * model_scale))
+
+    def draw_tessellated(self, object: Obj3D.Objeto3D, obj_coords: np.ndarray,
+                         valid: np.ndarray, clip: bool = True, density: int = None) -> None:
+        # Curves and surfaces: the polylines are tessellated once in object
+        # space (see Tessellation), every frame only projects them
+        pieces, inside = self.__cull_pieces(object, obj_coords, valid, clip)
+        if not len(pieces):
+            return
+        # With a tessellation pool, the pieces still being tessellated are
+        # drawn in a later frame (see collect_tessellation)
+        ready = request_tessellation(object, density, pieces)
+        if not ready.all():
+            pieces, inside = pieces[ready], inside[ready]
+            if not len(pieces):
+                return
+        polylines = tessellate(object, density, pieces)
+        n_pieces, n_lines, n_points, _ = polylines.shape
+        world = polylines.reshape(-1, 4) @ object.model_matrix
+        projected = self.__transformator.perspective(world)
+        normalized, valid = self.__transformator.normalize(projected)
+
+        if n_lines == 1:
+            # The segments of a curve that follow each other are a single
+            # polyline, split only where the clipping is needed or not
+            breaks = np.flatnonzero((np.diff(pieces) != 1) | (inside[1:] != inside[:-1])) + 1
+            starts = np.concatenate([[0], breaks])
+            stops = np.append(breaks, n_pieces)
+            runs = list(zip((starts * n_points).tolist(), (stops * n_points).tolist()))
+            runs_inside = inside[starts]
+        else:
+            runs = [(i * n_points, (i + 1) * n_points) for i in range(n_pieces * n_lines)]
+            runs_inside = np.repeat(inside, n_lines)
+
+        if valid.all():
+            lines = [normalized[a:b] for a, b in runs]
+        else:
+            # Cut where they go behind the projection plane
+            chains = [list(range(a, b)) for a, b in runs]
+            projected, _, chains = self.__transformator.clip_rings_near(projected, [], chains)
+            normalized, _ = self.__transformator.normalize(projected)
+            lines = [normalized[chain] for chain in chains]
+            runs_inside = np.zeros(len(lines), dtype=bool)
+
+        runs_inside = runs_inside.tolist()
+        sub_curves = [line for line, line_inside in zip(lines, runs_inside) if line_inside]
+        sub_curves += self.__clipper.clip_polylines([line for line, line_inside
+                                                     in zip(lines, runs_inside) if not line_inside])
+        self.__viewport.draw_curve(sub_curves, object.color, self.__width_drawings)
+
+    def __cull_pieces(self, object: Obj3D.Objeto3D, obj_coords: np.ndarray,
+                      valid: np.ndarray, clip: bool) -> tuple[np.ndarray, np.ndarray]:
+        # Each segment or patch stays in the hull of its control points: the
+        # ones whose hull is out of the window are not tessellated at all,
+        # and the ones inside it are not clipped. Returns the pieces to
+        # draw and which of them are inside
+        indices = object.piece_indices
+        if not clip:
+            return np.arange(len(indices)), np.ones(len(indices), dtype=bool)
+
+        pieces_valid = valid[indices]
+        all_valid = pieces_valid.all(axis=1)
+        coords = obj_coords[indices]
+        bboxes = np.concatenate([coords.min(axis=1), coords.max(axis=1)], axis=1)
+        # With control points behind the projection plane the hull on the
+        # window is not known, nothing is trivially accepted or rejected
+        keep = np.where(all_valid, ~self.__clipper.bboxes_outside(bboxes), pieces_valid.any(axis=1))
+        inside = all_valid & self.__clipper.bboxes_inside(bboxes)
+        pieces = np.flatnonzero(keep)
+        return pieces, inside[pieces]
+
+    def __normalized_bbox(self, object: Obj3D.Objeto3D, obj_coords: np.ndarray,
+                          valid: np.ndarray) -> tuple[float]:
+        # The curves stay inside the hull of their control points
+        if not valid.any():
+            return (np.inf, np.inf, -np.inf, -np.inf)
+        # The points where the edges cross the plane are not known yet,
+        # so nothing is trivially accepted or rejected
+        if not valid.all():
+            return (-np.inf, -np.inf, np.inf, np.inf)
+        coords = obj_coords[valid]
+        x_min, y_min = coords.min(axis=0).tolist()
+        x_max, y_max = coords.max(axis=0).tolist()
+        return (x_min, y_min, x_max, y_max)
 
     def draw_point(self, coords: tuple[float], color: str) -> None:
         # if the point is outside the window, it is not drawn
         self.__viewport.draw_oval(self.__clipper.clip_point(coords),
                                   color, self.__width_drawings)
 
-    def draw_line(self, coords: list[tuple[float]], color: str) -> None:
-        self.__viewport.draw_line(self.__clipper.clip_line(coords),
-                                  color, self.__width_drawings)
+    def draw_line(self, coords: list[tuple[float]], color: str, clip: bool = True) -> None:
+        if clip:
+            # Same batch kernel as the packed scene, so both paths clip alike
+            segments, keep = self.__clipper.clip_segments(np.array([coords], dtype=float))
+            coords = segments[0].tolist() if keep[0] else []
+        self.__viewport.draw_line(coords, color, self.__width_drawings)
 
-    def draw_wireframe(self, coords: list[tuple[float]],
-                       edges:list[tuple[int]],
-                       color: str, fill=False) -> None:
-        self.__viewport.draw_polygon(*self.__clipper.clip_polygon(coords, edges),
-                                     color, self.__width_drawings, fill)
-
-    def draw_curve(self, coords: list[tuple[float]], color: str) -> None:
-        self.__viewport.draw_curve(self.__clipper.clip_curve(coords),
-                                   color, self.__width_drawings)
-
-    def draw_surface(self, coords: list[list[list[float]]], color: str) -> None:
-        for curve in coords:
-            self.draw_curve(curve, color)
+    def draw_wireframe(self, coords: np.ndarray,
+                       rings: list[list[int]], chains: list[list[int]],
+                       color: str, fill=False, clip: bool = True) -> None:
+        # rings: closed polygons (faces), chains: edges that don't close one
+        coords = np.asarray(coords, dtype=float)
+        if clip:
+            polygons = self.__clipper.clip_polygon(coords, rings)
+            pieces = self.__clipper.clip_polylines([coords[chain] for chain in chains])
+        else:
+            polygons = [coords[ring] for ring in rings]
+            pieces = [coords[chain] for chain in chains]
+        self.__viewport.draw_polygon(polygons, color, self.__width_drawings, fill)
+        self.__viewport.draw_curve(pieces, color, self.__width_drawings)
 
     
     def __update_width_drawings(self):
         self.__width_drawings = 2 * self.__transformator.scaling_factor
 
+    def forget_object(self, object: Obj3D.Objeto3D) -> None:
+        # Must be called when the object leaves the display file
+        self.__viewport.forget(id(object))
+
+    def begin_frame(self) -> None:
+        self.__viewport.begin_frame()
+
+    def end_frame(self) -> None:
+        # Updates only what changed since the last frame
+        self.__viewport.end_frame()
+
     def delete(self, object_name="all"):
         if object_name == "all":
             self.__viewport.delete("all")
@@ -97,6 +317,39 @@ class Window:
     def draw_viewport_outer_frame(self) -> None:
         self.__viewport.draw_outer_frame()
 
+    def set_tessellation_mode(self, mode: str, tolerance: float = None) -> None:
+        # "fixed" or "adaptive", the tolerance is in pixels
+        if mode not in ("fixed", "adaptive"):
+            print("Invalid tessellation mode", mode)
+            return
+        self.__adaptive_tessellation = mode == "adaptive"
+        if tolerance is not None:
+            self.__tessellation_tolerance = tolerance
+
+    def set_tessellation_pool(self, kind: str, workers: int = None) -> None:
+        # "serial" (the default), "thread" or "process", with up to
+        # MAX_DEFAULT_WORKERS workers unless told otherwise. The pools never
+        # block a frame, whoever draws must call collect_tessellation while
+        # tessellation_pending and draw again when something arrives
+        if kind not in tessellation_scheduler.KINDS:
+            print("Invalid tessellation pool", kind)
+            return
+        tessellation_scheduler.configure(kind, workers)
+
+    @property
+    def tessellation_pending(self) -> bool:
+        return tessellation_scheduler.pending
+
+    def collect_tessellation(self) -> bool:
+        # Whether new tiles arrived since the last frame
+        return tessellation_scheduler.collect() > 0
+
+    def set_render_backend(self, backend: str) -> None:
+        self.__viewport.set_backend(backend)
+
+    def save_image(self, file_name: str) -> None:
+        self.__viewport.save_image(file_name)
+
     # works for both lines and polygons algorithms
     def set_clipping_algorithm(self, algorithm: str) -> None:
         self.__clipper.set_clipping_algorithm(algorithm)
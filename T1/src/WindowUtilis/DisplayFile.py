@@ -1,23 +1,118 @@
 import tkinter as tk
+import numpy as np
 
 from src.Objetos import Objeto3D as Obj3D
 from src.WindowUtilis.DisplayFileFrame import DisplayFileFrame
+from src.WindowUtilis.SceneStore import SceneStore
+from src.WindowUtilis.SpatialGrid import SpatialGrid
 
 class DisplayFile:
-    def __init__(self, root, transformations_function: callable):
-        self.__objects = []
+    def __init__(self, root, transformations_function: callable,
+                 use_scene_store: bool = True, forget_function: callable = None):
+        # Every object gets a handle that never changes while it is in the
+        # display file (the list positions did when something was removed)
+        self.__objects = {}  # handle -> obj
+        self.__handles = {}  # id(obj) -> handle
+        self.__names = {}  # name -> {handle: None}, in insertion order
+        self.__next_handle = 0
+        # Called with every removed object, so whatever was drawn for it goes too
+        self.__forget_function = forget_function
+        # Objects that are not in the packed scene store (curves, surfaces...)
+        self.__unpacked_objects = {}  # handle -> obj
+        self.__scene_store = SceneStore() if use_scene_store else None
+        # World space index used to draw only what the window can see. The
+        # packed objects are culled by the scene store itself, in one
+        # vectorized test, the grid has only the ones drawn one by one
+        self.__grid = SpatialGrid()
         self.__frame = DisplayFileFrame(root, transformations_function)
         self.__frame.pack(side=tk.TOP)
 
-    def add_object(self, new_object: Obj3D.Objeto3D) -> None:
-        if new_object not in self.__objects and isinstance(new_object, Obj3D.Objeto3D):
-            self.__objects.append(new_object)
-            self.__frame.add_new_object(new_object.name, new_object.obj_type)
+    def __contains__(self, obj: Obj3D.Objeto3D) -> bool:
+        return id(obj) in self.__handles
+
+    def __len__(self) -> int:
+        return len(self.__objects)
+
+    def __insert(self, new_object: Obj3D.Objeto3D) -> int:
+        if new_object in self or not isinstance(new_object, Obj3D.Objeto3D):
+            return None
+        handle = self.__next_handle
+        self.__next_handle += 1
+
+        self.__objects[handle] = new_object
+        self.__handles[id(new_object)] = handle
+        self.__names.setdefault(new_object.name, {})[handle] = None
+        if self.__scene_store is None or not self.__scene_store.add(new_object):
+            self.__unpacked_objects[handle] = new_object
+            self.__grid.insert(new_object, new_object.world_bbox())
+        return handle
+
+    def add_object(self, new_object: Obj3D.Objeto3D) -> int:
+        handle = self.__insert(new_object)
+        if handle is not None:
+            self.__frame.add_new_object(handle, new_object.name, new_object.obj_type)
+        return handle
+
+    def add_objects(self, new_objects: list[Obj3D.Objeto3D]) -> list[int]:
+        # Whole files at once: a single insert in the object list
+        added = []
+        for new_object in new_objects:
+            handle = self.__insert(new_object)
+            if handle is not None:
+                added.append((handle, new_object.name, new_object.obj_type))
+        self.__frame.add_new_objects(added)
+        return [handle for handle, _, _ in added]
+
+    def update_object(self, obj: Obj3D.Objeto3D) -> None:
+        # Must be called after the object is transformed
+        if self.__scene_store is not None:
+            self.__scene_store.update(obj)
+        if obj in self.__grid:
+            self.__grid.update(obj, obj.world_bbox())
 
     def remove_object(self, obj: Obj3D.Objeto3D) -> None:
-        if obj in self.__objects:
-            self.__objects.remove(obj)
+        handle = self.__handles.pop(id(obj), None)
+        if handle is None:
+            return
+        del self.__objects[handle]
+        names = self.__names[obj.name]
+        del names[handle]
+        if not names:
+            del self.__names[obj.name]
+
+        if self.__unpacked_objects.pop(handle, None) is None and self.__scene_store is not None:
+            self.__scene_store.remove(obj)
+        self.__grid.remove(obj)
+        self.__frame.remove_object(handle)
+        if self.__forget_function is not None:
+            self.__forget_function(obj)
+
+    def get_object(self, handle: int) -> Obj3D.Objeto3D:
+        return self.__objects.get(handle)
+
+    def get_handle(self, obj: Obj3D.Objeto3D) -> int:
+        return self.__handles.get(id(obj))
+
+    def find(self, name: str) -> list[int]:
+        # Handles of the objects with this name, oldest first
+        return list(self.__names.get(name, ()))
+
+    def visible_objects(self, footprint: tuple[float], d: float) -> tuple[np.ndarray, list[Obj3D.Objeto3D]]:
+        # Objects whose world box is in the view: rows of the scene store
+        # and the objects drawn one by one
+        unpacked = self.__grid.query(footprint, d)
+        if self.__scene_store is None:
+            return np.zeros(0, dtype=np.int64), unpacked
+        return self.__scene_store.visible_rows(footprint, d), unpacked
 
     @property
     def objects(self) -> list[Obj3D.Objeto3D]:
-        return self.__objects
+        return list(self.__objects.values())
+
+    @property
+    def unpacked_objects(self) -> list[Obj3D.Objeto3D]:
+        return list(self.__unpacked_objects.values())
+
+    @property
+    def scene_store(self) -> SceneStore:
+        return self.__scene_store
@@ -1,4 +1,5 @@
 import tkinter as tk
+from bisect import bisect_left
 
 from src.TransformationUtils.TransformationsMenu import TransformationsMenu
 
@@ -8,7 +9,9 @@ class DisplayFileFrame(tk.Frame):
 
         self.__transformations_function = transformations_function
 
-        self.__current_index = -1
+        # Handle of the object in each row. The handles only grow and the
+        # rows are always appended, so this list stays sorted
+        self.__row_handles = []
         var = tk.Variable(value=[])
 
         tk.Label(self, text="Object List", font="System 12 bold").pack(fill=tk.X)
@@ -34,36 +37,55 @@ class DisplayFileFrame(tk.Frame):
         self.__is_button_hidden = True
 
         self.__selected_item_name = None
-        self.__selected_item_index = None
-
-    def add_new_object(self, name:str, obj_type:str) -> None:
-        self.__listbox.insert(
-            self.__get_index(), f"{name} ({str(obj_type).split('.')[-1].title()})"
-        )
-
-    def __get_index(self) -> int:
-        self.__current_index += 1
-        return self.__current_index
+        self.__selected_item_handle = None
+
+    def __label(self, name: str, obj_type: str) -> str:
+        return f"{name} ({str(obj_type).split('.')[-1].title()})"
+
+    def add_new_object(self, handle: int, name:str, obj_type:str) -> None:
+        self.add_new_objects([(handle, name, obj_type)])
+
+    def add_new_objects(self, objects: list[tuple[int, str, str]]) -> None:
+        # objects: (handle, name, type) of each one, a single insert for all
+        if not objects:
+            return
+        self.__listbox.insert(tk.END, *[self.__label(name, obj_type)
+                                        for _, name, obj_type in objects])
+        self.__row_handles.extend(handle for handle, _, _ in objects)
+
+    def remove_object(self, handle: int) -> None:
+        row = bisect_left(self.__row_handles, handle)
+        if row == len(self.__row_handles) or self.__row_handles[row] != handle:
+            return
+        del self.__row_handles[row]
+        self.__listbox.delete(row)
+        if self.__selected_item_handle == handle:
+            self.__selected_item_handle = None
+            self.__selected_item_name = None
 
     def __on_object_select(self, event) -> None:
         selection_exists = bool(self.__listbox.curselection())
 
         if selection_exists and self.__is_button_hidden:
-            self.__selected_item_index = self.__listbox.curselection()[0]
-            self.__selected_item_name = self.__listbox.get(self.__selected_item_index)
+            self.__select_row(self.__listbox.curselection()[0])
 
             self.__transf_hidden_button.pack()
             self.__is_button_hidden = False
 
         elif selection_exists:
-            self.__selected_item_index = self.__listbox.curselection()[0]
-            self.__selected_item_name = self.__listbox.get(self.__selected_item_index)
+            self.__select_row(self.__listbox.curselection()[0])
 
         elif not selection_exists and not self.__is_button_hidden:
             self.__transf_hidden_button.pack_forget()
             self.__is_button_hidden = True
 
+    def __select_row(self, row: int) -> None:
+        self.__selected_item_handle = self.__row_handles[row]
+        self.__selected_item_name = self.__listbox.get(row)
+
     def __show_transf_menu(self) -> None:
+        if self.__selected_item_handle is None:
+            return
         transf_menu = TransformationsMenu(self.__selected_item_name, master=self)
         transforms = transf_menu.show_window()
-        self.__transformations_function(self.__selected_item_index, transforms)
+        self.__transformations_function(self.__selected_item_handle, transforms)
@@ -27,6 +27,15 @@ class OptionsFrame(tk.Frame):
         self.__clipping_frame = tk.Frame(self)
         self.__clipping_frame.pack(pady=10)
 
+        self.__render_frame = tk.Frame(self)
+        self.__render_frame.pack(pady=10)
+
+        self.__tessellation_frame = tk.Frame(self)
+        self.__tessellation_frame.pack(pady=10)
+
+        self.__tessellation_pool_frame = tk.Frame(self)
+        self.__tessellation_pool_frame.pack(pady=10)
+
     def add_button(
         self,
         button_text: str,
@@ -77,4 +86,10 @@ class OptionsFrame(tk.Frame):
                 return self.__rotation_frame
             case "clipping":
                 return self.__clipping_frame
+            case "render":
+                return self.__render_frame
+            case "tessellation":
+                return self.__tessellation_frame
+            case "tessellation_pool":
+                return self.__tessellation_pool_frame
         return self
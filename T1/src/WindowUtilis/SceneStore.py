@@ -0,0 +1,224 @@
+import numpy as np
+
+from src.Objetos import Objeto3D as Obj3D
+from src.WindowUtilis.SpatialGrid import boxes_visible
+
+
+class SceneStore:
+    # Objects that can be drawn straight from the packed buffers
+    PACKED_TYPES = (Obj3D.ObjectType.POINT,
+                    Obj3D.ObjectType.LINE,
+                    Obj3D.ObjectType.WIREFRAME)
+
+    def __init__(self, initial_capacity: int = 1024):
+        # Scene-wide buffers (struct of arrays). Each one is bigger than
+        # what is in use, so appending an object is amortized O(its size)
+        self.__vertices = np.zeros((initial_capacity, 4))
+        self.__edges = np.zeros((initial_capacity, 2), dtype=np.int64)
+        self.__edge_color = np.zeros(initial_capacity, dtype=np.int32)
+        self.__alive_edges = np.zeros(initial_capacity, dtype=bool)
+        self.__n_vertices = 0
+        self.__n_edges = 0
+
+        # Per-object tables, indexed by the object's row
+        self.__vertex_offset = np.zeros(initial_capacity, dtype=np.int64)
+        self.__vertex_count = np.zeros(initial_capacity, dtype=np.int64)
+        self.__edge_offset = np.zeros(initial_capacity, dtype=np.int64)
+        self.__edge_count = np.zeros(initial_capacity, dtype=np.int64)
+        self.__type = np.zeros(initial_capacity, dtype=np.int8)
+        self.__color = np.zeros(initial_capacity, dtype=np.int32)
+        self.__alive = np.zeros(initial_capacity, dtype=bool)
+        # World AABB of each row, so the whole scene is culled at once
+        self.__bbox_min = np.zeros((initial_capacity, 3))
+        self.__bbox_max = np.zeros((initial_capacity, 3))
+        self.__n_rows = 0
+
+        self.__rows = {}  # id(obj) -> row
+        self.__row_objects = []
+        self.__palette = []
+        self.__palette_index = {}
+        self.__dead_vertices = 0
+
+    @classmethod
+    def accepts(cls, obj: Obj3D.Objeto3D) -> bool:
+        # Unfilled wireframes are packed as their edges and clipped edge by
+        # edge (Window.draw_scene), a face crossing the window keeps only its
+        # visible edges. Filled ones stay out of the store: their faces are
+        # clipped as closed rings by Sutherland-Hodgman (Window.draw_wireframe),
+        # which closes a cut face along the window border
+        return obj.obj_type in cls.PACKED_TYPES and not getattr(obj, "fill", False)
+
+    def __contains__(self, obj: Obj3D.Objeto3D) -> bool:
+        return id(obj) in self.__rows
+
+    def __len__(self) -> int:
+        return len(self.__rows)
+
+    def add(self, obj: Obj3D.Objeto3D) -> bool:
+        if obj in self or not self.accepts(obj):
+            return False
+
+        coords = obj.homogeneous_coordinates
+        if obj.obj_type == Obj3D.ObjectType.POINT:
+            edges = np.zeros((0, 2), dtype=np.int64)
+        elif obj.obj_type == Obj3D.ObjectType.LINE:
+            edges = np.array([(0, 1)], dtype=np.int64)
+        else:
+            edges = np.array(obj.edges, dtype=np.int64).reshape(-1, 2)
+
+        n_v, n_e = len(coords), len(edges)
+        self.__reserve_vertices(self.__n_vertices + n_v)
+        self.__reserve_edges(self.__n_edges + n_e)
+        self.__reserve_rows(self.__n_rows + 1)
+
+        row = self.__n_rows
+        v0, e0 = self.__n_vertices, self.__n_edges
+        color = self.__get_color_index(obj.color)
+
+        self.__vertices[v0:v0 + n_v] = coords
+        self.__edges[e0:e0 + n_e] = edges + v0
+        self.__edge_color[e0:e0 + n_e] = color
+        self.__alive_edges[e0:e0 + n_e] = True
+
+        self.__vertex_offset[row], self.__vertex_count[row] = v0, n_v
+        self.__edge_offset[row], self.__edge_count[row] = e0, n_e
+        self.__type[row] = obj.obj_type.value
+        self.__color[row] = color
+        self.__alive[row] = True
+        self.__bbox_min[row], self.__bbox_max[row] = obj.world_bbox()
+
+        self.__n_vertices += n_v
+        self.__n_edges += n_e
+        self.__n_rows += 1
+        self.__rows[id(obj)] = row
+        self.__row_objects.append(obj)
+        return True
+
+    def update(self, obj: Obj3D.Objeto3D) -> None:
+        # The transformations never change the number of vertices,
+        # so the new world coordinates are written over the old ones
+        row = self.__rows.get(id(obj))
+        if row is None:
+            return
+        v0, n_v = self.__vertex_offset[row], self.__vertex_count[row]
+        self.__vertices[v0:v0 + n_v] = obj.homogeneous_coordinates
+        self.__bbox_min[row], self.__bbox_max[row] = obj.world_bbox()
+
+    def remove(self, obj: Obj3D.Objeto3D) -> None:
+        row = self.__rows.pop(id(obj), None)
+        if row is None:
+            return
+        e0, n_e = self.__edge_offset[row], self.__edge_count[row]
+        self.__alive_edges[e0:e0 + n_e] = False
+        self.__alive[row] = False
+        self.__row_objects[row] = None
+        self.__dead_vertices += self.__vertex_count[row]
+
+        if self.__dead_vertices > self.__n_vertices // 2:
+            self.__compact()
+
+    def row(self, obj: Obj3D.Objeto3D) -> int:
+        return self.__rows[id(obj)]
+
+    def visible_rows(self, footprint: tuple[float], d: float) -> np.ndarray:
+        # Rows whose world box is in the view, see SpatialGrid.query
+        n = self.__n_rows
+        visible = self.__alive[:n] & boxes_visible(self.__bbox_min[:n], self.__bbox_max[:n],
+                                                   footprint, d)
+        return np.flatnonzero(visible)
+
+    def select(self, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray,
+                                                 np.ndarray, np.ndarray]:
+        # Geometry of some rows only: the index of their vertices in the
+        # store, their edges and points indexing into those vertices, and
+        # the colors of the edges and points
+        rows = np.sort(np.asarray(rows, dtype=np.int64))
+        v0, n_v = self.__vertex_offset[rows], self.__vertex_count[rows]
+        e0, n_e = self.__edge_offset[rows], self.__edge_count[rows]
+        local_v0 = np.cumsum(n_v) - n_v
+
+        vertex_indexes = self.__concatenate_ranges(v0, n_v)
+        edge_indexes = self.__concatenate_ranges(e0, n_e)
+        edges = self.__edges[edge_indexes] - np.repeat(v0 - local_v0, n_e)[:, None]
+        edge_colors = self.__edge_color[edge_indexes]
+
+        is_point = self.__type[rows] == Obj3D.ObjectType.POINT.value
+        return (vertex_indexes, edges, edge_colors,
+                local_v0[is_point], self.__color[rows[is_point]])
+
+    def __concatenate_ranges(self, starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        # [starts[0], ..., starts[0] + counts[0] - 1, starts[1], ...]
+        offsets = np.cumsum(counts) - counts
+        return np.arange(counts.sum()) - np.repeat(offsets - starts, counts)
+
+    def __compact(self) -> None:
+        objects = [obj for obj in self.__row_objects if obj is not None]
+        self.__n_vertices = self.__n_edges = self.__n_rows = 0
+        self.__alive[:] = False
+        self.__alive_edges[:] = False
+        self.__rows = {}
+        self.__row_objects = []
+        self.__dead_vertices = 0
+        for obj in objects:
+            self.add(obj)
+
+    def __get_color_index(self, color: str) -> int:
+        if color not in self.__palette_index:
+            self.__palette_index[color] = len(self.__palette)
+            self.__palette.append(color)
+        return self.__palette_index[color]
+
+    def __grow(self, array: np.ndarray, size: int) -> np.ndarray:
+        if size <= len(array):
+            return array
+        new_array = np.zeros((max(size, 2 * len(array)),) + array.shape[1:],
+                             dtype=array.dtype)
+        new_array[:len(array)] = array
+        return new_array
+
+    def __reserve_vertices(self, size: int) -> None:
+        self.__vertices = self.__grow(self.__vertices, size)
+
+    def __reserve_edges(self, size: int) -> None:
+        self.__edges = self.__grow(self.__edges, size)
+        self.__edge_color = self.__grow(self.__edge_color, size)
+        self.__alive_edges = self.__grow(self.__alive_edges, size)
+
+    def __reserve_rows(self, size: int) -> None:
+        self.__vertex_offset = self.__grow(self.__vertex_offset, size)
+        self.__vertex_count = self.__grow(self.__vertex_count, size)
+        self.__edge_offset = self.__grow(self.__edge_offset, size)
+        self.__edge_count = self.__grow(self.__edge_count, size)
+        self.__type = self.__grow(self.__type, size)
+        self.__color = self.__grow(self.__color, size)
+        self.__alive = self.__grow(self.__alive, size)
+        self.__bbox_min = self.__grow(self.__bbox_min, size)
+        self.__bbox_max = self.__grow(self.__bbox_max, size)
+
+    @property
+    def vertices(self) -> np.ndarray:
+        return self.__vertices[:self.__n_vertices]
+
+    @property
+    def edges(self) -> np.ndarray:
+        # Only the edges of objects still in the scene
+        n_e = self.__n_edges
+        return self.__edges[:n_e][self.__alive_edges[:n_e]]
+
+    @property
+    def edge_colors(self) -> np.ndarray:
+        n_e = self.__n_edges
+        return self.__edge_color[:n_e][self.__alive_edges[:n_e]]
+
+    @property
+    def points(self) -> tuple[np.ndarray, np.ndarray]:
+        # Vertex index and color of every point object
+        n = self.__n_rows
+        rows = np.flatnonzero(self.__alive[:n]
+                              & (self.__type[:n] == Obj3D.ObjectType.POINT.value))
+        return self.__vertex_offset[rows], self.__color[rows]
+
+    @property
+    def palette(self) -> list[str]:
+        return self.__palette
+
@@ -0,0 +1,125 @@
+from math import floor
+
+import numpy as np
+
+
+class SpatialGrid:
+    # Uniform grid over the world AABB of the objects. Every object is in
+    # all the cells its box touches, the ones touching too many cells are
+    # kept in a separate list and always tested.
+    def __init__(self, cell_size: float = 250.0, max_cells_per_object: int = 512):
+        self.__cell_size = cell_size
+        self.__max_cells_per_object = max_cells_per_object
+
+        self.__layers = {}  # k (z) -> {(i, j): {id(obj): obj}}
+        self.__objects = {}  # id(obj) -> (obj, bbox, cell ranges or None)
+        self.__large = {}  # id(obj) -> obj
+
+    def __len__(self) -> int:
+        return len(self.__objects)
+
+    def __contains__(self, obj) -> bool:
+        return id(obj) in self.__objects
+
+    def __cell_ranges(self, bbox: tuple[np.ndarray, np.ndarray]) -> tuple[range, range, range]:
+        low, high = bbox
+        return tuple(range(floor(low[axis] / self.__cell_size),
+                           floor(high[axis] / self.__cell_size) + 1)
+                     for axis in (0, 1, 2))
+
+    def insert(self, obj, bbox: tuple[np.ndarray, np.ndarray]) -> None:
+        if obj in self:
+            self.remove(obj)
+        ranges = self.__cell_ranges(bbox)
+        if len(ranges[0]) * len(ranges[1]) * len(ranges[2]) > self.__max_cells_per_object:
+            self.__large[id(obj)] = obj
+            self.__objects[id(obj)] = (obj, bbox, None)
+            return
+
+        x_range, y_range, z_range = ranges
+        for k in z_range:
+            layer = self.__layers.setdefault(k, {})
+            for i in x_range:
+                for j in y_range:
+                    layer.setdefault((i, j), {})[id(obj)] = obj
+        self.__objects[id(obj)] = (obj, bbox, ranges)
+
+    def update(self, obj, bbox: tuple[np.ndarray, np.ndarray]) -> None:
+        # Only the cells that the object left or entered are touched
+        if obj in self and self.__objects[id(obj)][2] == self.__cell_ranges(bbox):
+            self.__objects[id(obj)] = (obj, bbox, self.__objects[id(obj)][2])
+            return
+        self.insert(obj, bbox)
+
+    def remove(self, obj) -> None:
+        entry = self.__objects.pop(id(obj), None)
+        if entry is None:
+            return
+        _, _, ranges = entry
+        if ranges is None:
+            del self.__large[id(obj)]
+            return
+
+        x_range, y_range, z_range = ranges
+        for k in z_range:
+            layer = self.__layers[k]
+            for i in x_range:
+                for j in y_range:
+                    cell = layer[(i, j)]
+                    del cell[id(obj)]
+                    if not cell:
+                        del layer[(i, j)]
+            if not layer:
+                del self.__layers[k]
+
+    def query(self, footprint: tuple[float], d: float) -> list:
+        # footprint: (x_min, y_min, x_max, y_max) of the window on the
+        # projection plane z = d. A point (x, y, z) in front of the plane is
+        # projected to (x d / z, y d / z), so the visible region of the
+        # layer [z0, z1] is the footprint scaled by z0 / d and z1 / d
+        x_min, y_min, x_max, y_max = footprint
+        candidates = dict(self.__large)
+        for k, layer in self.__layers.items():
+            z0 = max(k * self.__cell_size, d)
+            z1 = (k + 1) * self.__cell_size
+            if z1 < d:
+                continue
+            scales = (z0 / d, z1 / d)
+            i_range = range(floor(min(x_min * s for s in scales) / self.__cell_size),
+                            floor(max(x_max * s for s in scales) / self.__cell_size) + 1)
+            j_range = range(floor(min(y_min * s for s in scales) / self.__cell_size),
+                            floor(max(y_max * s for s in scales) / self.__cell_size) + 1)
+
+            # Whichever is smaller: the cells in the view or the cells in use
+            if len(i_range) * len(j_range) < len(layer):
+                for i in i_range:
+                    for j in j_range:
+                        candidates.update(layer.get((i, j), ()))
+            else:
+                for (i, j), cell in layer.items():
+                    if i in i_range and j in j_range:
+                        candidates.update(cell)
+
+        if not candidates:
+            return []
+        objects = list(candidates.values())
+        boxes = [self.__objects[key][1] for key in candidates]
+        visible = boxes_visible(np.array([box[0] for box in boxes]),
+                                np.array([box[1] for box in boxes]), footprint, d)
+        return [obj for obj, is_visible in zip(objects, visible.tolist()) if is_visible]
+
+
+def boxes_visible(low: np.ndarray, high: np.ndarray, footprint: tuple[float],
+                  d: float) -> np.ndarray:
+    # low, high: (N, 3) corners of N world boxes. Projection of the part of
+    # each box in front of the plane, tested against the footprint
+    in_front = high[:, 2] >= d
+    z0 = np.maximum(low[:, 2], d)
+    z1 = np.maximum(high[:, 2], d)
+    xs = np.stack([low[:, 0] * d / z0, low[:, 0] * d / z1,
+                   high[:, 0] * d / z0, high[:, 0] * d / z1])
+    ys = np.stack([low[:, 1] * d / z0, low[:, 1] * d / z1,
+                   high[:, 1] * d / z0, high[:, 1] * d / z1])
+    x_min, y_min, x_max, y_max = footprint
+    return (in_front & (xs.max(axis=0) >= x_min) & (xs.min(axis=0) <= x_max)
+            & (ys.max(axis=0) >= y_min) & (ys.min(axis=0) <= y_max))
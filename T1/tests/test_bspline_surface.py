@@ -0,0 +1,23 @@
+from src.Objetos.BSplineSurface import BSplineSurface
+
+
+def grid(n_root: int) -> list[list[tuple[float]]]:
+    return [[(i, j, (i * j) % 7) for j in range(n_root)] for i in range(n_root)]
+
+
+def test_small_grid_keeps_its_density(capsys):
+    surface = BSplineSurface("small", grid(10))
+
+    assert surface.tessellation_density == 20
+    assert capsys.readouterr().out == ""
+
+
+def test_large_grid_density_is_lowered_with_a_message(capsys):
+    surface = BSplineSurface("large", grid(150))
+
+    assert surface.tessellation_density == surface.max_density < 20
+    assert surface.density_for_tolerance(1e-9) == surface.max_density
+    output = capsys.readouterr().out
+    # Said once, however many times the density is asked for
+    assert output.count("B-spline surface large") == 1
+    assert f"drawn with {surface.max_density} steps per patch instead of 20" in output
@@ -0,0 +1,63 @@
+from collections import Counter
+
+import numpy as np
+
+from src.OBJFileUtils import OBJParser
+
+
+def write_interleaved_obj(file_path, n_groups: int, n_rounds: int) -> None:
+    # Every round adds one triangle (with its own vertices) to each group,
+    # g 0 / g 1 / ... / g 0 / g 1 / ...
+    lines = []
+    n_vertices = 0
+    for k in range(n_rounds):
+        for g in range(n_groups):
+            lines.append(f"v {k} {g} 0\nv {k + 1} {g} 0\nv {k} {g + 1} 0\n")
+            lines.append(f"g group{g}\n")
+            lines.append(f"f {n_vertices + 1} {n_vertices + 2} {n_vertices + 3}\n")
+            n_vertices += 3
+    file_path.write_text("".join(lines))
+
+
+def test_interleaved_groups_are_yielded_at_most_twice(tmp_path):
+    file_path = tmp_path / "interleaved.obj"
+    write_interleaved_obj(file_path, n_groups=3, n_rounds=200)
+
+    yielded = list(OBJParser(str(file_path), lazy=True).iter_objects())
+
+    counts = Counter(name for name, _ in yielded)
+    assert set(counts) == {"group0", "group1", "group2"}
+    assert max(counts.values()) <= 2
+
+    # The last object of each name has the faces of every round
+    last = dict(yielded)
+    for obj in last.values():
+        assert obj["type"] == "faced_obj"
+        assert len(obj["edges"]) == 3 * 200
+
+
+def test_lazy_and_eager_parsers_agree_on_reopened_groups(tmp_path):
+    file_path = tmp_path / "interleaved.obj"
+    write_interleaved_obj(file_path, n_groups=2, n_rounds=50)
+
+    eager = OBJParser(str(file_path)).objects
+    lazy = dict(OBJParser(str(file_path), lazy=True).iter_objects())
+
+    assert eager.keys() == lazy.keys()
+    for name in eager:
+        assert np.array_equal(eager[name]["coordinates"], lazy[name]["coordinates"])
+        assert eager[name]["edges"] == lazy[name]["edges"]
+
+
+def test_group_closed_once_is_yielded_once(tmp_path):
+    file_path = tmp_path / "single.obj"
+    file_path.write_text("v 0 0 0\nv 1 0 0\nv 0 1 0\nv 1 1 0\n"
+                         "g a\nf 1 2 3\nf 2 4 3\n"
+                         "g b\nf 1 2 4\n")
+
+    yielded = list(OBJParser(str(file_path), lazy=True).iter_objects())
+
+    assert [name for name, _ in yielded] == ["a", "b"]
+    # The two faces of a share the edge 2-3
+    assert len(yielded[0][1]["coordinates"]) == 4
+    assert len(yielded[0][1]["edges"]) == 6
@@ -0,0 +1,49 @@
+import json
+
+import src.Window as WW
+from src.Objetos.ObjectFactory import create_object
+from src.WindowUtilis.SceneStore import SceneStore
+
+# A square on the projection plane with its right half out of the window
+SQUARE = [(50, -50, 173), (150, -50, 173), (150, 50, 173), (50, 50, 173)]
+
+
+def draw(tmp_path, fill: bool) -> tuple[list[dict], bool]:
+    window = WW.Window(None, 200, 200, backend="display_list")
+    obj = create_object("square", SQUARE, "#ff0000", fill=fill)
+    scene = SceneStore()
+    packed = scene.add(obj)
+
+    window.begin_frame()
+    if packed:
+        window.draw_scene(scene)
+    else:
+        window.draw_objects([obj])
+    window.end_frame()
+
+    file_name = tmp_path / "frame.json"
+    window.save_image(str(file_name))
+    return json.loads(file_name.read_text())["primitives"], packed
+
+
+def test_unfilled_wireframe_is_clipped_edge_by_edge(tmp_path):
+    primitives, packed = draw(tmp_path, fill=False)
+
+    assert packed
+    assert [p["type"] for p in primitives] == ["segments"]
+    # The right edge is out of the window and dropped, the top and bottom
+    # ones are cut at the border (x = 210 on the viewport)
+    segments = sorted(sorted(map(tuple, segment)) for segment in primitives[0]["segments"])
+    assert segments == [[(160.0, 60.0), (160.0, 160.0)],
+                        [(160.0, 60.0), (210.0, 60.0)],
+                        [(160.0, 160.0), (210.0, 160.0)]]
+
+
+def test_filled_wireframe_is_clipped_as_a_ring(tmp_path):
+    primitives, packed = draw(tmp_path, fill=True)
+
+    assert not packed
+    assert [p["type"] for p in primitives] == ["polygon"]
+    # The cut face is closed along the window border
+    points = sorted(map(tuple, primitives[0]["points"]))
+    assert points == [(160.0, 60.0), (160.0, 160.0), (210.0, 60.0), (210.0, 160.0)]